@@ -0,0 +1,202 @@
+# Solves many Sudoku boards at once on a pool of worker processes.
+import multiprocessing
+from collections import namedtuple
+from itertools import islice
+
+try:
+    from queue import Empty, Queue
+except ImportError: # Python 2
+    from Queue import Empty, Queue
+
+try:
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+except ImportError: # Python 2, see PoolRunner
+    ProcessPoolExecutor = None
+
+from Solver import getSolver
+from SolveResult import SOLVED
+
+# index is the position of the board in the input, solution the flat solved
+# board (None on failure), error a description of what went wrong and result
+# the solver's SolveResult (None when the solver itself failed).
+BatchResult = namedtuple("BatchResult", ["index", "solution", "error", "result"])
+
+def solveBatch(boards, workers=None, chunkSize=16, ordered=True, backend="backtracking", maxPending=None,
+               maxNodes=None, timeLimit=None):
+    '''
+    Solve every board of the iterable boards and yield a BatchResult per board.
+
+    workers is the number of processes (default: one per core, 0 solves in
+    this process), chunkSize the number of boards sent to a worker at a time
+    and maxPending the number of chunks in flight (default: 4 per worker),
+    which bounds memory when boards is a long stream. With ordered=True the
+    results come back in input order, otherwise as soon as they are done.
+    maxNodes and timeLimit are the search budget of every single board.
+    When a worker process dies, the boards it may have been solving come back
+    with an error and the pool is started afresh for the rest.
+    '''
+    limits = {"maxNodes": maxNodes, "timeLimit": timeLimit}
+    if workers == 0:
+        for chunk in chunked(enumerate(boards), chunkSize):
+            for result in solveChunk(0, chunk, backend, limits)[1]:
+                yield result
+        return
+    if workers == None:
+        workers = multiprocessing.cpu_count()
+    if maxPending == None:
+        maxPending = 4 * workers
+    chunks = chunked(enumerate(boards), chunkSize)
+    runner = (FuturesRunner if ProcessPoolExecutor != None else PoolRunner)(workers, backend, limits)
+    try:
+        #nextChunk counts the chunks yielded. In ordered mode the chunks held in
+        #waiting count against maxPending too, so one slow chunk stops the
+        #reading instead of letting finished results pile up behind it.
+        submitted = nextChunk = 0
+        waiting = {} # finished chunks that are ahead of the next one to yield
+        while True:
+            while submitted - nextChunk < maxPending:
+                chunk = next(chunks, None)
+                if chunk == None:
+                    break
+                runner.submit(submitted, chunk)
+                submitted += 1
+            if nextChunk == submitted:
+                break
+            number, results = runner.next()
+            if not ordered:
+                nextChunk += 1
+                for result in results:
+                    yield result
+                continue
+            waiting[number] = results
+            while nextChunk in waiting:
+                for result in waiting.pop(nextChunk):
+                    yield result
+                nextChunk += 1
+    finally:
+        runner.close()
+
+class FuturesRunner(object):
+    '''
+    Runs chunks on a ProcessPoolExecutor. A dead worker breaks the whole
+    executor, so every chunk in flight then comes back as errors and the
+    next chunk starts a new executor.
+    '''
+
+    def __init__(self, workers, backend, limits):
+        self.workers, self.backend, self.limits = workers, backend, limits
+        self.executor = ProcessPoolExecutor(workers)
+        self.pending = {} # future -> (chunk number, chunk)
+
+    def submit(self, number, chunk):
+        if self.executor == None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        future = self.executor.submit(solveChunk, number, chunk, self.backend, self.limits)
+        self.pending[future] = (number, chunk)
+
+    #(chunk number, results) of the next chunk to finish
+    def next(self):
+        future = next(iter(wait(self.pending, return_when=FIRST_COMPLETED)[0]))
+        number, chunk = self.pending.pop(future)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            if self.executor != None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+            return number, lostChunk(chunk)
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        if self.executor != None:
+            self.executor.shutdown(wait=False)
+
+class PoolRunner(object):
+    '''
+    Runs chunks on a multiprocessing.Pool, for Python 2. A pool never calls
+    back for the chunk of a dead worker, so the wait for results checks every
+    POLL seconds that the workers are still alive; once one is gone, all
+    chunks in flight come back as errors and a new pool takes over.
+    '''
+    POLL = 1.0
+
+    def __init__(self, workers, backend, limits):
+        self.workers, self.backend, self.limits = workers, backend, limits
+        self.done = Queue() # filled by the pool's result thread
+        self.lost = [] # (chunk number, results) of the chunks of a dead pool
+        self.pool = None
+
+    def start(self):
+        before = set([child.pid for child in multiprocessing.active_children()])
+        self.pool = multiprocessing.Pool(self.workers)
+        self.pids = set([child.pid for child in multiprocessing.active_children()]) - before
+        self.pending = {} # chunk number -> chunk
+        self.done = Queue() # results of a dead pool must not turn up later
+
+    def submit(self, number, chunk):
+        if self.pool == None:
+            self.start()
+        self.pending[number] = chunk
+        self.pool.apply_async(solveChunk, (number, chunk, self.backend, self.limits), callback=self.done.put)
+
+    def next(self):
+        while not self.lost:
+            try:
+                number, results = self.done.get(timeout=self.POLL)
+            except Empty:
+                alive = set([child.pid for child in multiprocessing.active_children()])
+                if not self.pids <= alive:
+                    self.lost = [(number, lostChunk(chunk)) for number, chunk in sorted(self.pending.items())]
+                    self.close()
+                continue
+            del self.pending[number]
+            return number, results
+        return self.lost.pop(0)
+
+    def close(self):
+        if self.pool != None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+#Error results for the boards of a chunk whose worker process died
+def lostChunk(chunk):
+    return [BatchResult(index, None, "the worker process solving this board died", None) for index, board in chunk]
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+#Runs in the worker processes
+def solveChunk(number, chunk, backend, limits):
+    if backend == "numpy":
+        return number, solveVectorized(chunk, limits)
+    return number, [solveOne(index, board, backend, limits) for index, board in chunk]
+
+#The whole chunk goes through VectorSolver at once
+def solveVectorized(chunk, limits):
+    try:
+        results = getSolver("numpy").solveBoards([list(board) for index, board in chunk], **limits)
+    except Exception as error:
+        message = "%s: %s" % (type(error).__name__, error)
+        return [BatchResult(index, None, message, None) for index, board in chunk]
+    return [toBatchResult(index, result) for (index, board), result in zip(chunk, results)]
+
+def solveOne(index, board, backend, limits):
+    try:
+        result = getSolver(backend).solve(list(board), **limits)
+    except Exception as error:
+        return BatchResult(index, None, "%s: %s" % (type(error).__name__, error), None)
+    return toBatchResult(index, result)
+
+def toBatchResult(index, result):
+    if result.status == SOLVED:
+        return BatchResult(index, result.solution, None, result)
+    return BatchResult(index, None, result.describe(), result)
+
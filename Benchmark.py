@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# Times the solver backends on the puzzle collections in corpora/ and compares
+# the numbers with a saved baseline, e.g.
+#
+#   python Benchmark.py -o baseline.json
+#   ... change the search ...
+#   python Benchmark.py --baseline baseline.json
+#
+# Results are written as JSON: one run per (backend, corpus) with puzzles per
+# second, latency percentiles, nodes (assigned and mistakes) per puzzle and the
+# peak memory allocated while solving. Every corpus is solved --repeat times,
+# and again until --min-time seconds have passed, and the best round counts:
+# a small corpus takes milliseconds, so a single round mostly measures what
+# else the machine was busy with. The numpy backend solves each corpus as one
+# batch, so its latencies are the batch time split evenly over the puzzles.
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from PuzzleIO import readBoards
+from Solver import BACKENDS, getSolver
+from SolveResult import SOLVED
+
+CORPORA = ("easy", "hardest", "17clue")
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora")
+
+#(metric, True when higher is better, True for a timing) compared against the baseline
+METRICS = (("puzzlesPerSecond", True, True), ("p90", False, True), ("nodesPerPuzzle", False, False),
+           ("peakMemory", False, False))
+
+#Timings of a corpus with fewer puzzles than this are noisier, and are allowed
+#a tolerance larger by the square root of the ratio
+TIMING_PUZZLES = 200
+
+#Seconds every corpus is solved for at least, in as many rounds as that takes
+MIN_TIME = 1.0
+
+#The boards of a bundled corpus by name, or of any puzzle file by path
+def loadCorpus(name):
+    path = name if os.path.exists(name) else os.path.join(CORPUS_DIR, name + ".txt")
+    return list(readBoards(path))
+
+#Nearest-rank percentile of sorted values
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+#Solve boards and return (result, seconds) per board. The numpy backend gets
+#them all in one solveBoards call, the batch it is built for, and every board
+#is charged an even share of that call's time.
+def solveAll(solver, backend, boards, options):
+    if backend == "numpy":
+        began = time.time()
+        results = solver.solveBoards(boards, **options)
+        share = (time.time() - began) / len(boards) if boards else 0.0
+        return [(result, share) for result in results]
+    timed = []
+    for board in boards:
+        began = time.time()
+        result = solver.solve(board, **options)
+        timed.append((result, time.time() - began))
+    return timed
+
+def benchmark(backend, boards, repeat=3, memory=True, minTime=MIN_TIME, **options):
+    '''
+    Solve every board with a fresh backend solver in at least repeat rounds
+    and for at least minTime seconds, and return the statistics of the run
+    as a dict: the time of the fastest round and the fastest latency of
+    every board. options are passed to solve() (solveBoards() for numpy,
+    see solveAll).
+    '''
+    solver = getSolver(backend)
+    latencies = [None] * len(boards)
+    seconds = None
+    rounds = 0
+    began = time.time()
+    while rounds < max(repeat, 1) or (boards and time.time() - began < minTime):
+        rounds += 1
+        solved = assigned = mistakes = 0
+        start = time.time()
+        for index, (result, latency) in enumerate(solveAll(solver, backend, boards, options)):
+            if latencies[index] == None or latency < latencies[index]:
+                latencies[index] = latency
+            solved += result.status == SOLVED
+            assigned += result.stats.get("assigned", 0)
+            mistakes += result.stats.get("mistakes", 0)
+        elapsed = time.time() - start
+        if seconds == None or elapsed < seconds:
+            seconds = elapsed
+    latencies.sort()
+    count = len(latencies)
+    return {"puzzles": count,
+            "solved": solved,
+            "rounds": rounds,
+            "seconds": seconds,
+            "puzzlesPerSecond": count / seconds if count and seconds else None,
+            "mean": seconds / count if count else None,
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p99": percentile(latencies, 0.99),
+            "max": percentile(latencies, 1.0),
+            "assignedPerPuzzle": assigned / float(count) if count else None,
+            "mistakesPerPuzzle": mistakes / float(count) if count else None,
+            "nodesPerPuzzle": (assigned + mistakes) / float(count) if count else None,
+            "peakMemory": peakMemory(backend, boards, options) if memory else None}
+
+def peakMemory(backend, boards, options):
+    '''
+    The most bytes allocated at once while solving boards, measured in a
+    separate pass since tracing slows the solvers down. None where
+    tracemalloc is missing (Python 2).
+    '''
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    solver = getSolver(backend)
+    tracemalloc.start()
+    try:
+        solveAll(solver, backend, boards, options)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def runBenchmarks(backends, corpora, repeat=3, memory=True, minTime=MIN_TIME, **options):
+    runs = []
+    for corpus in corpora:
+        boards = loadCorpus(corpus)
+        for backend in backends:
+            run = {"backend": backend, "corpus": corpus}
+            run.update(benchmark(backend, boards, repeat, memory, minTime, **options))
+            runs.append(run)
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "options": options,
+            "runs": runs}
+
+def compareResults(results, baseline, tolerance=0.25):
+    '''
+    Return (backend, corpus, metric, baseline value, new value) for every
+    METRICS value of results that is worse than in baseline by more than
+    tolerance (a fraction, widened for the timings of small corpora, see
+    TIMING_PUZZLES). Runs missing from either side are skipped.
+    '''
+    before = dict(((run["backend"], run["corpus"]), run) for run in baseline["runs"])
+    regressions = []
+    for run in results["runs"]:
+        old = before.get((run["backend"], run["corpus"]))
+        if old == None:
+            continue
+        for metric, higherIsBetter, timing in METRICS:
+            if old.get(metric) == None or run.get(metric) == None:
+                continue
+            allowed = tolerance
+            if timing and 0 < run["puzzles"] < TIMING_PUZZLES:
+                allowed *= (TIMING_PUZZLES / float(run["puzzles"])) ** 0.5
+            if higherIsBetter:
+                worse = run[metric] < old[metric] * (1 - min(allowed, 1))
+            else:
+                worse = run[metric] > old[metric] * (1 + allowed)
+            if worse:
+                regressions.append((run["backend"], run["corpus"], metric, old[metric], run[metric]))
+    return regressions
+
+#value * scale in format, or "-" for a missing value (an empty corpus)
+def formatValue(format, value, scale=1):
+    return "-" if value == None else format % (value * scale)
+
+def formatReport(results, baseline=None):
+    before = {}
+    if baseline != None:
+        before = dict(((run["backend"], run["corpus"]), run) for run in baseline["runs"])
+    lines = ["%-12s %-8s %7s %10s %9s %9s %9s %10s %9s" %
+             ("backend", "corpus", "solved", "puzzles/s", "p50 ms", "p90 ms", "p99 ms", "nodes", "peak KiB")]
+    for run in results["runs"]:
+        lines.append("%-12s %-8s %3d/%-3d %10s %9s %9s %9s %10s %9s" %
+                     (run["backend"], run["corpus"], run["solved"], run["puzzles"],
+                      formatValue("%.1f", run["puzzlesPerSecond"]), formatValue("%.3f", run["p50"], 1000),
+                      formatValue("%.3f", run["p90"], 1000), formatValue("%.3f", run["p99"], 1000),
+                      formatValue("%.1f", run["nodesPerPuzzle"]), formatValue("%d", run["peakMemory"], 1 / 1024.0)))
+        old = before.get((run["backend"], run["corpus"]))
+        if old != None:
+            changes = ["%s %+.1f%%" % (metric, 100.0 * (run[metric] - old[metric]) / old[metric])
+                       for metric, higherIsBetter, timing in METRICS if run.get(metric) and old.get(metric)]
+            lines.append("%21s vs baseline: %s" % ("", ", ".join(changes)))
+    return "\n".join(lines)
+
+def parseArguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solvers on the bundled corpora.")
+    parser.add_argument("-b", "--backend", action="append", choices=BACKENDS,
+                        help="backend to time, may be repeated (default: backtracking)")
+    parser.add_argument("-c", "--corpus", action="append",
+                        help="corpus name (%s) or puzzle file, may be repeated (default: all)" % ", ".join(CORPORA))
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fraction by which a metric may be worse than the baseline, more for the timings "
+                             "of corpora under %d puzzles (default: 0.25)" % TIMING_PUZZLES)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="solve every corpus at least this many times and keep the best round (default: 3)")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME,
+                        help="keep solving every corpus for at least this many seconds (default: %g)" % MIN_TIME)
+    parser.add_argument("--time-limit", type=float, help="give up on a puzzle after this many seconds")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory pass")
+    return parser.parse_args(arguments)
+
+def main(arguments=None):
+    arguments = parseArguments(arguments)
+    options = {}
+    if arguments.time_limit != None:
+        options["timeLimit"] = arguments.time_limit
+    results = runBenchmarks(arguments.backend or ["backtracking"], arguments.corpus or CORPORA,
+                            arguments.repeat, not arguments.no_memory, arguments.min_time, **options)
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+    print(formatReport(results, baseline))
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if baseline != None:
+        regressions = compareResults(results, baseline, arguments.tolerance)
+        for backend, corpus, metric, old, new in regressions:
+            print("regression: %s on %s, %s %.6g -> %.6g" % (backend, corpus, metric, old, new), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
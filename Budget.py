@@ -0,0 +1,47 @@
+# Limits on how much work a single solve may do. The solvers call spend() once
+# per search node; the clock and the cancel token are only looked at every
+# CHECK_EVERY nodes so the checks stay cheap.
+import time
+
+CHECK_EVERY = 128
+
+class BudgetExceeded(Exception):
+    pass
+
+#Shared with the code that wants to stop a running solve, e.g. a GUI thread
+class CancelToken(object):
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class Budget(object):
+
+    def __init__(self, maxNodes=None, timeLimit=None, cancel=None):
+        self.maxNodes = maxNodes
+        self.deadline = None
+        if timeLimit != None:
+            self.deadline = time.time() + timeLimit
+        self.cancel = cancel
+        self.nodes = 0
+
+    def spend(self):
+        self.nodes += 1
+        if self.maxNodes != None and self.nodes > self.maxNodes:
+            raise BudgetExceeded("node budget of %d exhausted" % self.maxNodes)
+        if self.nodes % CHECK_EVERY == 0:
+            self.check()
+
+    def check(self):
+        if self.cancel != None and self.cancel.cancelled:
+            raise BudgetExceeded("cancelled")
+        if self.deadline != None and time.time() > self.deadline:
+            raise BudgetExceeded("time budget exhausted")
+
+#A Budget, or None when there is nothing to enforce, so unlimited solves skip the checks
+def makeBudget(maxNodes=None, timeLimit=None, cancel=None):
+    if maxNodes == None and timeLimit == None and cancel == None:
+        return None
+    return Budget(maxNodes, timeLimit, cancel)
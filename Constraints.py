@@ -0,0 +1,281 @@
+# Variant rules for the backtracking Solver: diagonals (X-Sudoku), irregular
+# boxes (jigsaw) and killer cages, e.g.
+#
+#   Solver().solve(board, constraints=[Diagonals(), Killer([(13, [0, 1]), (9, [2, 11, 20]), ...])])
+#
+# Jigsaw regions take the place of the boxes in the Geometry, so all the box
+# rules of the solver work on them unchanged. The other constraints take part
+# in propagation: once the solver's own rules find nothing more, every
+# constraint gets the assignments made since it last ran and removes the
+# candidates they rule out with Solver.eliminate, which puts the eliminations
+# on the undo trail like any other.
+from itertools import combinations
+
+from Geometry import boxSizeFor, getGeometry
+from SolveResult import findConflicts
+
+class Constraint(object):
+    '''
+    Base class of the variant constraints. A constraint is bound to the
+    solve in progress, so one constraint object serves one solve at a time.
+    '''
+    kind = "constraint"
+    regions = None # region of every cell when the constraint replaces the boxes
+
+    def bind(self, solver, geometry):
+        self.solver = solver
+        self.geometry = geometry
+
+    #Description of the first problem of board under this constraint, or None
+    def findConflict(self, board):
+        return None
+
+    #Called once per solve before propagation starts
+    def start(self, grid):
+        pass
+
+    #assigned holds (cell, number) for every assignment since the last call,
+    #the givens included on the first one; entries whose cell has been emptied
+    #again are stale and skipped. Returns None on a contradiction, otherwise
+    #whether anything changed.
+    def propagate(self, grid, assigned, trail):
+        return False
+
+class ExtraUnits(Constraint):
+    '''
+    Groups of cells that must hold different numbers, on top of the rows,
+    columns and boxes. A unit of size cells holds every number once, which
+    also gives hidden singles.
+    '''
+    kind = "unit"
+
+    def __init__(self, units):
+        self.units = [tuple(unit) for unit in units]
+
+    def getUnits(self, cells):
+        return self.units
+
+    def bind(self, solver, geometry):
+        Constraint.bind(self, solver, geometry)
+        units = self.getUnits(geometry.cells)
+        self.unitsOf = [[] for cell in range(geometry.cells)]
+        for unit in units:
+            for cell in unit:
+                self.unitsOf[cell].append(unit)
+        self.fullUnits = [unit for unit in units if len(unit) == geometry.size]
+
+    def findConflict(self, board):
+        for index, unit in enumerate(self.getUnits(len(board))):
+            seen = set()
+            for cell in unit:
+                if not 0 <= cell < len(board):
+                    return "%s %d: no cell %r" % (self.kind, index + 1, cell)
+                number = board[cell]
+                if number in seen:
+                    return "%d appears twice in %s %d" % (number, self.kind, index + 1)
+                if number:
+                    seen.add(number)
+        return None
+
+    def propagate(self, grid, assigned, trail):
+        solver = self.solver
+        changed = False
+        for cell, number in assigned:
+            if grid[cell] != number:
+                continue
+            for unit in self.unitsOf[cell]:
+                for other in unit:
+                    if grid[other] == number and other != cell:
+                        return None
+                changed = solver.eliminate(grid, unit, 1 << (number - 1), trail) or changed
+        if self.fullUnits:
+            result = solver.hiddenSingles(grid, trail, self.fullUnits)
+            if result == None:
+                return None
+            changed = result or changed
+        return changed
+
+class Diagonals(ExtraUnits):
+    '''X-Sudoku: both long diagonals hold every number once.'''
+    kind = "diagonal"
+
+    def __init__(self):
+        ExtraUnits.__init__(self, [])
+
+    def getUnits(self, cells):
+        size = getGeometry(boxSizeFor(cells)).size
+        return [tuple([index * size + index for index in range(size)]),
+                tuple([index * size + size - 1 - index for index in range(size)])]
+
+class Jigsaw(Constraint):
+    '''
+    Irregular boxes: regions[cell] is the region, 0..size - 1, of every cell.
+    The regions replace the boxes of the Geometry, so there is nothing left
+    to propagate here.
+    '''
+    kind = "region"
+
+    def __init__(self, regions):
+        self.regions = tuple(regions)
+
+#A region layout with one character per cell, cells with the same character
+#sharing a region, e.g. "111222333111222333..."; whitespace is skipped
+def parseRegions(text):
+    labels = {}
+    return [labels.setdefault(char, len(labels)) for char in text if not char.isspace()]
+
+_sumTables = {}
+
+#(count, total) -> bitmasks of the sets of count different numbers of 1..size
+#adding up to total, for count up to maxCount
+def getSumTable(size, maxCount):
+    key = (size, maxCount)
+    if key not in _sumTables:
+        table = {}
+        for count in range(min(maxCount, size) + 1):
+            for numbers in combinations(range(1, size + 1), count):
+                mask = 0
+                for number in numbers:
+                    mask |= 1 << (number - 1)
+                table.setdefault((count, sum(numbers)), []).append(mask)
+        _sumTables[key] = dict([(entry, tuple(masks)) for entry, masks in table.items()])
+    return _sumTables[key]
+
+class Killer(Constraint):
+    '''
+    Killer cages: cages is a list of (total, cells), and the numbers in the
+    cells of a cage are different and add up to total. A cage keeps only the
+    candidates that belong to some set of different numbers fitting its empty
+    cells and making up the rest of its total. Cages are looked at again only
+    after an assignment inside them or in a peer of one of their cells, or
+    after another cage removed candidates of their cells.
+    Every unit adds up to 1 + ... + size, so the cells of a unit outside the
+    cages that lie wholly within it make one more cage with the rest of that
+    sum, as long as it is no longer than the longest real cage.
+    '''
+    kind = "cage"
+
+    def __init__(self, cages):
+        self.cages = [(total, tuple(cells)) for total, cells in cages]
+
+    def bind(self, solver, geometry):
+        Constraint.bind(self, solver, geometry)
+        longest = max([len(cells) for total, cells in self.cages] or [0])
+        self.sums = getSumTable(geometry.size, longest)
+        self.allCages = list(self.cages)
+        unitTotal = geometry.size * (geometry.size + 1) // 2
+        for unit in geometry.units:
+            inside = [(total, cells) for total, cells in self.cages if set(cells) <= set(unit)]
+            covered = set([cell for total, cells in inside for cell in cells])
+            rest = tuple([cell for cell in unit if cell not in covered])
+            if inside and 0 < len(rest) <= longest:
+                self.allCages.append((unitTotal - sum([total for total, cells in inside]), rest))
+        self.cagesOf = [[] for cell in range(geometry.cells)]
+        near = [set() for cell in range(geometry.cells)]
+        for index, (total, cells) in enumerate(self.allCages):
+            for cell in cells:
+                self.cagesOf[cell].append(index)
+                near[cell].add(index)
+                for peer in geometry.peers[cell]:
+                    near[peer].add(index)
+        self.near = [tuple(cages) for cages in near]
+
+    def findConflict(self, board):
+        boxSize = boxSizeFor(len(board))
+        size = getGeometry(boxSize).size if boxSize else 0
+        caged = set()
+        for index, (total, cells) in enumerate(self.cages):
+            if len(cells) > size:
+                return "cage %d has more cells than there are numbers" % (index + 1)
+            seen = set()
+            for cell in cells:
+                if not 0 <= cell < len(board):
+                    return "cage %d: no cell %r" % (index + 1, cell)
+                if cell in caged:
+                    return "cell %d is in two cages" % cell
+                caged.add(cell)
+                number = board[cell]
+                if number in seen:
+                    return "%d appears twice in cage %d" % (number, index + 1)
+                if number:
+                    seen.add(number)
+            if (len(cells), total) not in getSumTable(size, len(cells)):
+                return "cage %d: %d different numbers cannot add up to %d" % (index + 1, len(cells), total)
+            given = sum(seen)
+            if given > total or (len(seen) == len(cells) and given != total):
+                return "the givens of cage %d do not add up to %d" % (index + 1, total)
+        return None
+
+    def start(self, grid):
+        self.dirty = set(range(len(self.allCages)))
+
+    def propagate(self, grid, assigned, trail):
+        dirty, self.dirty = self.dirty, set()
+        near = self.near
+        for cell, number in assigned:
+            if grid[cell] == number:
+                dirty.update(near[cell])
+        changed = False
+        while dirty:
+            index = dirty.pop()
+            result = self.propagateCage(index, grid, trail)
+            if result == None:
+                return None
+            if result:
+                changed = True
+                for cell in self.allCages[index][1]:
+                    dirty.update(self.cagesOf[cell])
+        return changed
+
+    def propagateCage(self, index, grid, trail):
+        total, cells = self.allCages[index]
+        solver = self.solver
+        used = 0
+        empty = []
+        for cell in cells:
+            number = grid[cell]
+            if number:
+                bit = 1 << (number - 1)
+                if used & bit:
+                    return None
+                used |= bit
+                total -= number
+            else:
+                empty.append(cell)
+        if not empty:
+            return None if total else False
+        candidates = [solver.getCandidates(cell) & ~used for cell in empty]
+        union = 0
+        for bits in candidates:
+            union |= bits
+        possible = 0
+        for mask in self.sums.get((len(empty), total), ()):
+            if mask & ~union:
+                continue
+            for bits in candidates:
+                if not bits & mask:
+                    break
+            else:
+                possible |= mask
+        if not possible:
+            return None
+        return solver.eliminate(grid, empty, self.geometry.allNumbers & ~possible, trail)
+
+#The regions of the first constraint that replaces the boxes, or None
+def getRegions(constraints):
+    for constraint in constraints or ():
+        if constraint.regions != None:
+            return constraint.regions
+    return None
+
+def checkConstraints(board, constraints):
+    '''
+    findConflicts for a board under the variant constraints: the rows,
+    columns and boxes (or jigsaw regions) first, then every constraint.
+    '''
+    conflict = findConflicts(board, getRegions(constraints))
+    for constraint in constraints or ():
+        if conflict:
+            break
+        conflict = constraint.findConflict([number or 0 for number in board])
+    return conflict
@@ -0,0 +1,237 @@
+# A Sudoku Solver that treats the puzzle as an exact cover problem and
+# solves it with Knuth's Algorithm X on Dancing Links.
+#
+# Every candidate placement (row, col, number) is a matrix row that covers four
+# columns: the cell, the number in the row, the number in the column and the
+# number in the box. A solution is a set of rows covering each column exactly once.
+import time
+
+from Budget import BudgetExceeded, makeBudget
+from Geometry import boxSizeFor, getGeometry
+from SolveResult import SolveResult, SOLVED, UNSOLVABLE, INVALID, TIMEOUT, findConflicts
+
+class DLXSolver(object):
+
+    def __init__(self):
+        self.mistakes = 0
+        self.assigned  = 0
+        self.budget = None
+
+    def solve(self, board, maxNodes=None, timeLimit=None, cancel=None):
+        '''
+        maxNodes, timeLimit and cancel bound the search as for Solver.solve.
+        Returns a SolveResult.
+        '''
+        conflict = findConflicts(board)
+        if conflict:
+            return SolveResult(INVALID, message=conflict)
+        start = time.time()
+        assigned, mistakes = self.assigned, self.mistakes
+        self.budget = makeBudget(maxNodes, timeLimit, cancel)
+        solution = reason = None
+        try:
+            for solution in self.solutions(board, 1):
+                break
+        except BudgetExceeded as stop:
+            reason = str(stop)
+        finally:
+            self.budget = None
+        stats = {"assigned": self.assigned - assigned,
+                 "mistakes": self.mistakes - mistakes,
+                 "time": time.time() - start}
+        if reason != None:
+            return SolveResult(TIMEOUT, stats=stats, message=reason)
+        if solution == None:
+            return SolveResult(UNSOLVABLE, stats=stats)
+        return SolveResult(SOLVED, solution, stats)
+
+    def solutions(self, board, limit=None):
+        '''
+        Yield every solution of board as a flat list, stopping after limit
+        solutions when limit is given. Invalid boards have none.
+        '''
+        if (limit != None and limit <= 0) or findConflicts(board) or not self.buildMatrix(board):
+            return # none wanted, or the givens contradict each other
+        found = 0
+        for solution in self.search(True):
+            yield solution
+            found += 1
+            if limit != None and found >= limit:
+                return
+
+    def countSolutions(self, board, limit=None):
+        '''
+        Return the number of solutions of board, counting no further than
+        limit. The solved grids are never built.
+        '''
+        if (limit != None and limit <= 0) or findConflicts(board) or not self.buildMatrix(board):
+            return 0
+        count = 0
+        for solution in self.search(False):
+            count += 1
+            if limit != None and count >= limit:
+                break
+        return count
+
+    #True when board has exactly one solution
+    def isUnique(self, board):
+        return self.countSolutions(board, 2) == 1
+
+    #Algorithm X: cover the column with the fewest rows, then try each of its rows.
+    #The levels live on an explicit stack of [column, selected row] instead of
+    #recursion, so boards of any size stay clear of the recursion limit.
+    #Yields every solution, as a grid when materialize is set and as None otherwise.
+    def search(self, materialize):
+        R, D, S = self.R, self.D, self.S
+        stack = []
+        while True:
+            if R[0] == 0:
+                yield self.GenSolvedGrid() if materialize else None
+            else:
+                column = R[0]
+                j = R[column]
+                while j != 0:
+                    if S[j] < S[column]:
+                        column = j
+                    j = R[j]
+                if S[column] != 0:
+                    self.cover(column)
+                    node = D[column]
+                    self.selectRow(node)
+                    stack.append([column, node])
+                    continue
+            #Move on to the next row of the deepest column that has one left
+            while stack:
+                frame = stack[-1]
+                column, node = frame
+                self.deselectRow(node)
+                node = D[node]
+                if node != column:
+                    self.selectRow(node)
+                    frame[1] = node
+                    break
+                self.uncover(column)
+                stack.pop()
+            else:
+                return
+
+    def selectRow(self, node):
+        R, C = self.R, self.C
+        if self.budget != None:
+            self.budget.spend()
+        self.partial.append(self.rowIds[node])
+        j = R[node]
+        while j != node:
+            self.cover(C[j])
+            j = R[j]
+        self.assigned += 1
+
+    def deselectRow(self, node):
+        L, C = self.L, self.C
+        self.partial.pop()
+        j = L[node]
+        while j != node:
+            self.uncover(C[j])
+            j = L[j]
+        self.mistakes += 1
+
+    def cover(self, column):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[column]] = R[column]
+        L[R[column]] = L[column]
+        i = D[column]
+        while i != column:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]
+                U[D[j]] = U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, column):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[column]
+        while i != column:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = j
+                U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[column]] = column
+        L[R[column]] = column
+
+    #Build the exact cover matrix (729 x 324 for a 9x9 board) and cover the givens.
+    #Returns False when the givens conflict.
+    def buildMatrix(self, board):
+        self.geometry = geometry = getGeometry(boxSizeFor(len(board)))
+        size, cells = geometry.size, geometry.cells
+        columns = 4 * cells
+        # node 0 is the root, nodes 1..columns are the column headers
+        self.L = [i - 1 for i in range(columns + 1)]
+        self.R = [i + 1 for i in range(columns + 1)]
+        self.L[0] = columns
+        self.R[columns] = 0
+        self.U = list(range(columns + 1))
+        self.D = list(range(columns + 1))
+        self.C = list(range(columns + 1))
+        self.S = [0] * (columns + 1)
+        self.rowIds = [None] * (columns + 1)
+        self.partial = []
+        firstNodes = {}
+        for cell in range(cells):
+            row, col, box = geometry.rowOf[cell], geometry.colOf[cell], geometry.boxOf[cell]
+            for number in range(1, size + 1):
+                rowId = cell * size + number - 1
+                firstNodes[rowId] = self.addRow(rowId, [
+                    1 + cell,
+                    1 + cells + row * size + number - 1,
+                    1 + 2 * cells + col * size + number - 1,
+                    1 + 3 * cells + box * size + number - 1])
+        covered = set()
+        for cell in range(cells):
+            number = board[cell]
+            if number == "" or number == 0:
+                continue
+            node = firstNodes[cell * size + number - 1]
+            row = [node] + self.walkRow(node)
+            if [j for j in row if self.C[j] in covered]:
+                return False
+            for j in row:
+                covered.add(self.C[j])
+                self.cover(self.C[j])
+            self.partial.append(cell * size + number - 1)
+        return True
+
+    def addRow(self, rowId, columns):
+        first = len(self.C)
+        for k, column in enumerate(columns):
+            node = first + k
+            self.L.append(first + (k - 1) % len(columns))
+            self.R.append(first + (k + 1) % len(columns))
+            self.U.append(self.U[column])
+            self.D.append(column)
+            self.C.append(column)
+            self.rowIds.append(rowId)
+            self.D[self.U[column]] = node
+            self.U[column] = node
+            self.S[column] += 1
+        return first
+
+    def walkRow(self, node):
+        nodes = []
+        j = self.R[node]
+        while j != node:
+            nodes.append(j)
+            j = self.R[j]
+        return nodes
+
+    def GenSolvedGrid(self):
+        size = self.geometry.size
+        grid = [0] * self.geometry.cells
+        for rowId in self.partial:
+            grid[rowId // size] = rowId % size + 1
+        return grid
+
@@ -0,0 +1,125 @@
+# Generates Sudoku puzzles with a unique solution.
+#
+# A puzzle starts as a random complete grid; givens are then removed in random
+# order, and a removal is kept only while the puzzle still has exactly one
+# solution. Every puzzle is reproducible from its seed, whatever the number of
+# worker processes.
+import random
+
+from Geometry import getGeometry
+from Solver import Solver
+from SolveResult import SOLVED
+
+#Difficulty bands, by the weakest deductions that solve the puzzle without guessing:
+#"easy" needs naked/hidden singles only, "medium" also locked candidates and naked
+#pairs, "hard" needs guessing.
+DIFFICULTIES = ("easy", "medium", "hard")
+
+def generateSolution(rng, boxSize=3):
+    '''
+    A random complete grid. The boxes on the diagonal do not constrain each
+    other, so they are filled with random permutations and the solver
+    completes the rest.
+    '''
+    geometry = getGeometry(boxSize)
+    numbers = list(range(1, geometry.size + 1))
+    while True:
+        board = [0] * geometry.cells
+        for box in range(0, geometry.size, boxSize + 1):
+            rng.shuffle(numbers)
+            for cell, number in zip(geometry.boxUnits[box], numbers):
+                board[cell] = number
+        result = Solver().solve(board)
+        if result.status == SOLVED:
+            return shuffleNumbers(result.solution, rng, geometry.size)
+
+#Relabel the numbers at random, so the grids do not all start with the same order
+def shuffleNumbers(board, rng, size):
+    labels = list(range(1, size + 1))
+    rng.shuffle(labels)
+    return [labels[number - 1] if number else 0 for number in board]
+
+def gradePuzzle(board):
+    '''
+    The difficulty band of a puzzle with a unique solution, see DIFFICULTIES.
+    '''
+    if Solver().solve(board, maxNodes=0).status == SOLVED:
+        return "easy"
+    if Solver().solve(board, lockedCandidates=True, nakedPairs=True, maxNodes=0).status == SOLVED:
+        return "medium"
+    return "hard"
+
+def removeGivens(solution, rng, minGivens=0, symmetric=False):
+    '''
+    Blank cells of solution in random order while the solution stays unique,
+    stopping at minGivens givens. With symmetric=True cells are removed in
+    pairs that mirror each other through the centre of the board.
+    '''
+    puzzle = list(solution)
+    cells = list(range(len(puzzle)))
+    rng.shuffle(cells)
+    solver = Solver()
+    givens = len(puzzle)
+    for cell in cells:
+        group = set([cell, len(puzzle) - 1 - cell]) if symmetric else set([cell])
+        group = [other for other in group if puzzle[other]]
+        if not group or givens - len(group) < minGivens:
+            continue
+        for other in group:
+            puzzle[other] = 0
+        if solver.countSolutions(puzzle, 2) == 1:
+            givens -= len(group)
+        else:
+            for other in group:
+                puzzle[other] = solution[other]
+    return puzzle
+
+def generatePuzzle(seed, boxSize=3, givens=None, difficulty=None, symmetric=False, attempts=100):
+    '''
+    Generate one puzzle from seed. givens is a (minimum, maximum) range for
+    the number of givens and difficulty one of DIFFICULTIES. Grids are drawn
+    until a puzzle meets both, at most attempts times.
+    Returns (puzzle, solution), or None when no attempt succeeded.
+    '''
+    if difficulty != None and difficulty not in DIFFICULTIES:
+        raise ValueError("unknown difficulty: %r" % (difficulty,))
+    minGivens, maxGivens = givens or (0, getGeometry(boxSize).cells)
+    rng = random.Random(seed)
+    for attempt in range(attempts):
+        solution = generateSolution(rng, boxSize)
+        puzzle = removeGivens(solution, rng, minGivens, symmetric)
+        if len([number for number in puzzle if number]) > maxGivens:
+            continue
+        if difficulty != None and gradePuzzle(puzzle) != difficulty:
+            continue
+        return puzzle, solution
+    return None
+
+def generatePuzzles(count, seed=0, workers=None, **options):
+    '''
+    Yield (index, puzzle, solution) for count puzzles, generated on a pool of
+    workers processes (default: one per core, 0 for none). Puzzle i comes
+    from its own seed derived from seed and i, so the output only depends on
+    seed. options are passed on to generatePuzzle; a puzzle that could not
+    be generated is yielded with None for puzzle and solution.
+    '''
+    jobs = ((seed * 1000003 + index, options) for index in range(count))
+    if workers == 0:
+        results = map(generateJob, jobs)
+    else:
+        import multiprocessing # only needed here, keeps importing this module cheap
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap(generateJob, jobs)
+    try:
+        for index, result in enumerate(results):
+            puzzle, solution = result or (None, None)
+            yield index, puzzle, solution
+    finally:
+        if workers != 0:
+            pool.terminate()
+            pool.join()
+
+#Runs in the worker processes
+def generateJob(job):
+    seed, options = job
+    return generatePuzzle(seed, **options)
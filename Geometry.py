@@ -0,0 +1,114 @@
+# The layout of a Sudoku board with boxes of boxSize x boxSize cells: a
+# size x size grid (size = boxSize ** 2) holding the numbers 1..size.
+# Cells are numbered row by row from 0 to size ** 2 - 1.
+#
+# Everything here is computed once per box size and kept in tuples, so the
+# solvers index into these tables instead of working out rows, boxes, peers
+# or bit counts again. The 9x9 layout is built when the module is imported.
+from collections import OrderedDict
+
+#Boards with up to this many numbers get real bit tables (2 ** size entries each)
+TABLE_SIZE_LIMIT = 16
+
+class Geometry(object):
+
+    #regions optionally replaces the boxes by irregular ones (jigsaw Sudoku):
+    #regions[cell] is the region, 0..size - 1, of every cell
+    def __init__(self, boxSize, regions=None):
+        self.boxSize = boxSize
+        self.size = size = boxSize * boxSize
+        self.cells = size * size
+        self.allNumbers = (1 << size) - 1 # one bit per number 1..size
+
+        self.rowOf = tuple([cell // size for cell in range(self.cells)])
+        self.colOf = tuple([cell % size for cell in range(self.cells)])
+        if regions == None:
+            self.boxOf = tuple([(row // boxSize) * boxSize + col // boxSize
+                                for row, col in zip(self.rowOf, self.colOf)])
+        else:
+            self.boxOf = tuple(regions)
+            if len(self.boxOf) != self.cells or sorted(self.boxOf) != sorted(list(range(size)) * size):
+                raise ValueError("regions must give %d regions of %d cells each" % (size, size))
+
+        #The units (rows, columns and boxes) as tuples of cells
+        self.rowUnits = tuple([tuple(range(row * size, row * size + size)) for row in range(size)])
+        self.colUnits = tuple([tuple(range(col, self.cells, size)) for col in range(size)])
+        self.boxUnits = tuple([tuple([cell for cell in range(self.cells) if self.boxOf[cell] == box])
+                               for box in range(size)])
+        self.units = self.rowUnits + self.colUnits + self.boxUnits
+
+        #The cells that share a unit with each cell
+        self.peers = tuple([tuple(sorted(set(self.rowUnits[self.rowOf[cell]] +
+                                             self.colUnits[self.colOf[cell]] +
+                                             self.boxUnits[self.boxOf[cell]]) - set([cell])))
+                            for cell in range(self.cells)])
+
+        #Every box/line overlap as (overlap, rest of the box, rest of the line)
+        intersections = []
+        for box in self.boxUnits:
+            for line in self.rowUnits + self.colUnits:
+                inside = tuple([cell for cell in box if cell in line])
+                if inside:
+                    intersections.append((inside,
+                                          tuple([cell for cell in box if cell not in inside]),
+                                          tuple([cell for cell in line if cell not in inside])))
+        self.intersections = tuple(intersections)
+
+        #bitCount[mask] is the number of bits set in a candidate mask and
+        #lowestNumber[mask] the number of its lowest bit (0 for an empty mask)
+        self.bitCount, self.lowestNumber = getMaskTables(size)
+
+_maskTables = {}
+
+#The bitCount and lowestNumber tables of Geometry, shared by every geometry of that size
+def getMaskTables(size):
+    if size not in _maskTables:
+        if size <= TABLE_SIZE_LIMIT:
+            bitCount = [0] * (1 << size)
+            for mask in range(1, 1 << size):
+                bitCount[mask] = bitCount[mask >> 1] + (mask & 1)
+            _maskTables[size] = (tuple(bitCount),
+                                 tuple([(mask & -mask).bit_length() for mask in range(1 << size)]))
+        else:
+            _maskTables[size] = (BitCount(), LowestNumber())
+    return _maskTables[size]
+
+#Stand-ins for the tables of boards too large to tabulate, indexed the same way
+class BitCount(object):
+
+    def __getitem__(self, mask):
+        return bin(mask).count("1")
+
+class LowestNumber(object):
+
+    def __getitem__(self, mask):
+        return (mask & -mask).bit_length()
+
+#Geometries per box size, kept for good. Jigsaw layouts are many, so only the
+#most recently used MAX_REGION_GEOMETRIES of those are kept, oldest first.
+MAX_REGION_GEOMETRIES = 16
+_geometries = {}
+_regionGeometries = OrderedDict()
+
+def getGeometry(boxSize, regions=None):
+    if regions == None:
+        if boxSize not in _geometries:
+            _geometries[boxSize] = Geometry(boxSize)
+        return _geometries[boxSize]
+    key = (boxSize, tuple(regions))
+    geometry = _regionGeometries.pop(key, None)
+    if geometry == None:
+        geometry = Geometry(boxSize, regions)
+        while len(_regionGeometries) >= MAX_REGION_GEOMETRIES:
+            _regionGeometries.popitem(last=False)
+    _regionGeometries[key] = geometry
+    return geometry
+
+#The box size of a board with that many cells, or None if no square board has that many
+def boxSizeFor(cells):
+    boxSize = int(round(cells ** 0.25))
+    if boxSize < 1 or boxSize ** 4 != cells:
+        return None
+    return boxSize
+
+getGeometry(3)
@@ -0,0 +1,351 @@
+# Solves Sudoku the way a person would and grades it by what that took.
+#
+# The deductions are tried in a fixed order of strength, always going back to
+# the weakest one after any progress: singles, locked candidates, subsets and
+# fish (by size), then chains. Only when none of them applies does the board go
+# to the backtracking Solver. The candidates of every cell are kept as bitmasks
+# and updated as numbers are placed and candidates eliminated, so no
+# technique has to recompute them.
+from collections import namedtuple
+from itertools import combinations
+
+from Geometry import boxSizeFor, getGeometry
+from Solver import Solver
+from SolveResult import SOLVED, UNSOLVABLE, INVALID, findConflicts
+
+#(technique, rating) in the order they are tried. The score of a puzzle is the
+#rating of the hardest technique it needed.
+TECHNIQUES = (("naked single", 1.0),
+              ("hidden single", 1.5),
+              ("locked candidates", 2.0),
+              ("naked pair", 3.0),
+              ("hidden pair", 3.4),
+              ("x-wing", 3.6),
+              ("naked triple", 3.8),
+              ("hidden triple", 4.0),
+              ("swordfish", 4.2),
+              ("naked quad", 5.0),
+              ("hidden quad", 5.4),
+              ("jellyfish", 5.6),
+              ("xy-wing", 6.0),
+              ("coloring", 6.5),
+              ("backtracking", 10.0))
+RATINGS = dict(TECHNIQUES)
+
+# status is one of SOLVED, UNSOLVABLE, INVALID; solution the solved board or
+# None; score the rating of the hardest technique used (0.0 for a full board);
+# techniques the technique of every step, in order; message explains INVALID.
+Grade = namedtuple("Grade", ["status", "solution", "score", "techniques", "message"])
+
+class LogicSolver(object):
+
+    def grade(self, board):
+        '''
+        Solve board (a flat list, "" or 0 for blanks) with the techniques
+        and return a Grade.
+        '''
+        conflict = findConflicts(board)
+        if conflict:
+            return Grade(INVALID, None, None, [], conflict)
+        self.geometry = getGeometry(boxSizeFor(len(board)))
+        self.grid = [number or 0 for number in board]
+        self.initCandidates()
+        steps = [(name, getattr(self, method)) for name, method in (
+            ("naked single", "nakedSingle"),
+            ("hidden single", "hiddenSingle"),
+            ("locked candidates", "lockedCandidates"),
+            ("naked pair", "nakedPair"),
+            ("hidden pair", "hiddenPair"),
+            ("x-wing", "xWing"),
+            ("naked triple", "nakedTriple"),
+            ("hidden triple", "hiddenTriple"),
+            ("swordfish", "swordfish"),
+            ("naked quad", "nakedQuad"),
+            ("hidden quad", "hiddenQuad"),
+            ("jellyfish", "jellyfish"),
+            ("xy-wing", "xyWing"),
+            ("coloring", "coloring"))]
+        techniques = []
+        while self.blanks:
+            for name, step in steps:
+                progress = step()
+                if progress == None:
+                    return self.finish(UNSOLVABLE, techniques)
+                if progress:
+                    techniques.append(name)
+                    break
+            else:
+                techniques.append("backtracking")
+                result = Solver().solve(self.grid)
+                if result.status != SOLVED:
+                    return self.finish(UNSOLVABLE, techniques)
+                self.grid = result.solution
+                break
+        return self.finish(SOLVED, techniques)
+
+    def finish(self, status, techniques):
+        score = max([RATINGS[name] for name in techniques] or [0.0])
+        return Grade(status, self.grid if status == SOLVED else None, score, techniques, None)
+
+    #Candidates of every empty cell from the numbers used in its units
+    def initCandidates(self):
+        geometry, grid = self.geometry, self.grid
+        self.candidates = [0] * geometry.cells
+        self.blanks = 0
+        for cell in range(geometry.cells):
+            if grid[cell] == 0:
+                used = 0
+                for peer in geometry.peers[cell]:
+                    if grid[peer]:
+                        used |= 1 << (grid[peer] - 1)
+                self.candidates[cell] = geometry.allNumbers & ~used
+                self.blanks += 1
+
+    def place(self, cell, number):
+        self.grid[cell] = number
+        self.candidates[cell] = 0
+        self.blanks -= 1
+        keep = ~(1 << (number - 1))
+        candidates = self.candidates
+        for peer in self.geometry.peers[cell]:
+            candidates[peer] &= keep
+
+    #Remove bits from the candidates of the empty cells among cells.
+    #Returns whether anything was removed.
+    def eliminate(self, cells, bits):
+        changed = False
+        candidates = self.candidates
+        for cell in cells:
+            if candidates[cell] & bits:
+                candidates[cell] &= ~bits
+                changed = True
+        return changed
+
+    #Every technique below makes at most one deduction and returns True when it
+    #made one, False when it found none and None when the board is contradictory.
+
+    def nakedSingle(self):
+        grid, candidates = self.grid, self.candidates
+        for cell in range(self.geometry.cells):
+            if grid[cell] == 0:
+                bits = candidates[cell]
+                if not bits:
+                    return None
+                if not bits & (bits - 1):
+                    self.place(cell, bits.bit_length())
+                    return True
+        return False
+
+    def hiddenSingle(self):
+        grid, candidates = self.grid, self.candidates
+        allNumbers = self.geometry.allNumbers
+        for unit in self.geometry.units:
+            placed = once = twice = 0
+            for cell in unit:
+                if grid[cell]:
+                    placed |= 1 << (grid[cell] - 1)
+                else:
+                    twice |= once & candidates[cell]
+                    once |= candidates[cell]
+            if (placed | once) != allNumbers:
+                return None
+            singles = once & ~twice & ~placed
+            if singles:
+                number = self.geometry.lowestNumber[singles]
+                bit = 1 << (number - 1)
+                for cell in unit:
+                    if candidates[cell] & bit:
+                        self.place(cell, number)
+                        return True
+        return False
+
+    #Pointing and claiming, as in Solver.eliminateLockedCandidates
+    def lockedCandidates(self):
+        candidates = self.candidates
+        for inside, boxRest, lineRest in self.geometry.intersections:
+            numbers = boxNumbers = lineNumbers = 0
+            for cell in inside:
+                numbers |= candidates[cell]
+            if not numbers:
+                continue
+            for cell in boxRest:
+                boxNumbers |= candidates[cell]
+            for cell in lineRest:
+                lineNumbers |= candidates[cell]
+            pointing = numbers & ~boxNumbers & lineNumbers
+            if pointing and self.eliminate(lineRest, pointing):
+                return True
+            claiming = numbers & ~lineNumbers & boxNumbers
+            if claiming and self.eliminate(boxRest, claiming):
+                return True
+        return False
+
+    def nakedPair(self):
+        return self.nakedSubset(2)
+
+    def nakedTriple(self):
+        return self.nakedSubset(3)
+
+    def nakedQuad(self):
+        return self.nakedSubset(4)
+
+    #size cells of a unit holding only size candidates between them take those
+    #numbers, which leaves them out of the rest of the unit
+    def nakedSubset(self, size):
+        candidates, bitCount = self.candidates, self.geometry.bitCount
+        for unit in self.geometry.units:
+            empty = [cell for cell in unit if candidates[cell]]
+            if len(empty) <= size:
+                continue
+            cells = [cell for cell in empty if bitCount[candidates[cell]] <= size]
+            for subset in combinations(cells, size):
+                numbers = 0
+                for cell in subset:
+                    numbers |= candidates[cell]
+                if bitCount[numbers] == size and \
+                   self.eliminate([cell for cell in empty if cell not in subset], numbers):
+                    return True
+        return False
+
+    def hiddenPair(self):
+        return self.hiddenSubset(2)
+
+    def hiddenTriple(self):
+        return self.hiddenSubset(3)
+
+    def hiddenQuad(self):
+        return self.hiddenSubset(4)
+
+    #size numbers that only fit into the same size cells of a unit fill those
+    #cells, which leaves no room there for other candidates
+    def hiddenSubset(self, size):
+        candidates, bitCount = self.candidates, self.geometry.bitCount
+        for unit in self.geometry.units:
+            empty = [cell for cell in unit if candidates[cell]]
+            if len(empty) <= size:
+                continue
+            places = {} # number bit -> bitmask of its positions in empty
+            for position, cell in enumerate(empty):
+                bits = candidates[cell]
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    places[bit] = places.get(bit, 0) | 1 << position
+            numbers = [bit for bit in places if bitCount[places[bit]] <= size]
+            for subset in combinations(numbers, size):
+                positions = bits = 0
+                for bit in subset:
+                    positions |= places[bit]
+                    bits |= bit
+                if bitCount[positions] == size:
+                    cells = [cell for position, cell in enumerate(empty) if positions >> position & 1]
+                    if self.eliminate(cells, ~bits & self.geometry.allNumbers):
+                        return True
+        return False
+
+    def xWing(self):
+        return self.fish(2)
+
+    def swordfish(self):
+        return self.fish(3)
+
+    def jellyfish(self):
+        return self.fish(4)
+
+    #When a number fits into size rows only within the same size columns, it
+    #takes one cell of each of those columns inside these rows, so it goes from
+    #the rest of the columns. The same holds with rows and columns swapped.
+    def fish(self, size):
+        geometry, candidates, bitCount = self.geometry, self.candidates, self.geometry.bitCount
+        for bases, covers, coverOf in ((geometry.rowUnits, geometry.colUnits, geometry.colOf),
+                                       (geometry.colUnits, geometry.rowUnits, geometry.rowOf)):
+            for number in range(geometry.size):
+                bit = 1 << number
+                lines = [] # (base index, bitmask of the cover lines holding bit)
+                for index, base in enumerate(bases):
+                    positions = 0
+                    for cell in base:
+                        if candidates[cell] & bit:
+                            positions |= 1 << coverOf[cell]
+                    if 2 <= bitCount[positions] <= size:
+                        lines.append((index, positions))
+                for subset in combinations(lines, size):
+                    positions = 0
+                    for index, linePositions in subset:
+                        positions |= linePositions
+                    if bitCount[positions] != size:
+                        continue
+                    baseCells = set()
+                    for index, linePositions in subset:
+                        baseCells.update(bases[index])
+                    others = [cell for cover in range(geometry.size) if positions >> cover & 1
+                              for cell in covers[cover] if cell not in baseCells]
+                    if self.eliminate(others, bit):
+                        return True
+        return False
+
+    #A cell with candidates {a, b} and two of its peers with {a, c} and {b, c}:
+    #whichever number the pivot takes, one of the wings is c, so no cell seeing
+    #both wings can be c.
+    def xyWing(self):
+        peers, candidates, bitCount = self.geometry.peers, self.candidates, self.geometry.bitCount
+        for pivot in range(self.geometry.cells):
+            bits = candidates[pivot]
+            if bitCount[bits] != 2:
+                continue
+            wings = [peer for peer in peers[pivot] if bitCount[candidates[peer]] == 2 and
+                     bitCount[candidates[peer] & bits] == 1]
+            for first, second in combinations(wings, 2):
+                common = candidates[first] & candidates[second]
+                if bitCount[common] != 1 or common & bits or \
+                   (candidates[first] | candidates[second]) & bits != bits:
+                    continue
+                seen = set(peers[first]) & set(peers[second])
+                if self.eliminate(seen, common):
+                    return True
+        return False
+
+    #Simple coloring: the cells of a number linked by units where it has only
+    #two places alternate between true and false. Two cells of one color in a
+    #unit make that color false; a cell seeing both colors cannot hold the number.
+    def coloring(self):
+        geometry, candidates = self.geometry, self.candidates
+        peerSets = [set(peers) for peers in geometry.peers]
+        for number in range(geometry.size):
+            bit = 1 << number
+            links = {}
+            for unit in geometry.units:
+                cells = [cell for cell in unit if candidates[cell] & bit]
+                if len(cells) == 2:
+                    links.setdefault(cells[0], []).append(cells[1])
+                    links.setdefault(cells[1], []).append(cells[0])
+            colors = {}
+            for start in links:
+                if start in colors:
+                    continue
+                colors[start] = 0
+                groups = ([start], [])
+                pending = [start]
+                while pending:
+                    cell = pending.pop()
+                    for other in links[cell]:
+                        if other not in colors:
+                            colors[other] = 1 - colors[cell]
+                            groups[colors[other]].append(other)
+                            pending.append(other)
+                for color in (0, 1):
+                    cells = groups[color]
+                    for first, second in combinations(cells, 2):
+                        if second in peerSets[first]:
+                            self.eliminate(cells, bit)
+                            return True
+                component = set(groups[0] + groups[1])
+                trapped = [cell for cell in range(geometry.cells) if candidates[cell] & bit and
+                           cell not in component and
+                           not peerSets[cell].isdisjoint(groups[0]) and not peerSets[cell].isdisjoint(groups[1])]
+                if self.eliminate(trapped, bit):
+                    return True
+        return False
+
+def gradeBoard(board):
+    return LogicSolver().grade(board)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# A packed binary format for large puzzle corpora.
+#
+# A file starts with an 8-byte header, MAGIC and one byte for the box size,
+# followed by one fixed-size record per board. Boards up to 9x9 take 4 bits per
+# cell, first cell in the high nibble, so a 9x9 record is 41 bytes; larger
+# boards take one byte per cell. Blanks are 0. Fixed records make board i
+# readable straight from a memory map without scanning the file:
+#
+#   PackedBoards.py pack puzzles.txt puzzles.sdk
+#   PackedBoards.py unpack puzzles.sdk puzzles.txt
+from __future__ import print_function
+
+import mmap
+import sys
+from itertools import chain
+
+import PuzzleIO
+from Geometry import boxSizeFor, getGeometry
+
+MAGIC = b"SDKPACK"
+HEADER = len(MAGIC) + 1
+
+#The two cells of every packed byte
+NIBBLES = tuple([(byte >> 4, byte & 15) for byte in range(256)])
+
+def isPacked(boxSize):
+    return getGeometry(boxSize).size < 16
+
+def recordSize(boxSize):
+    cells = getGeometry(boxSize).cells
+    return (cells + 1) // 2 if isPacked(boxSize) else cells
+
+def packBoard(board):
+    numbers = [number or 0 for number in board]
+    if not isPacked(boxSizeFor(len(numbers))):
+        return bytes(bytearray(numbers))
+    if len(numbers) % 2:
+        numbers.append(0)
+    return bytes(bytearray([numbers[i] << 4 | numbers[i + 1] for i in range(0, len(numbers), 2)]))
+
+#The board of a record as a flat list with 0 for blanks
+def unpackBoard(record, boxSize):
+    record = bytearray(record)
+    if not isPacked(boxSize):
+        return list(record)
+    return list(chain.from_iterable([NIBBLES[byte] for byte in record]))[:getGeometry(boxSize).cells]
+
+def writePacked(boards, target, boxSize=3):
+    '''
+    Write the boards of the iterable boards, all of box size boxSize, to the
+    file at path target. Returns the number of boards written.
+    '''
+    count = 0
+    with open(target, "wb") as output:
+        output.write(MAGIC + bytes(bytearray([boxSize])))
+        for board in boards:
+            if boxSizeFor(len(board)) != boxSize:
+                raise ValueError("board %d: %d cells, expected %d" % (count, len(board), getGeometry(boxSize).cells))
+            output.write(packBoard(board))
+            count += 1
+    return count
+
+class PackedCorpus(object):
+    '''
+    A packed file opened through a read-only memory map. corpus[i] is board
+    i as a list, and grids() hands whole ranges to NumPy (for
+    VectorSolver.solveBoards) without decoding boards one by one.
+    '''
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # an empty file cannot be mapped
+            self.file.close()
+            raise ValueError("%s is not a packed puzzle file" % path)
+        if len(self.data) < HEADER or self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("%s is not a packed puzzle file" % path)
+        self.boxSize = bytearray(self.data[len(MAGIC):HEADER])[0]
+        self.recordSize = recordSize(self.boxSize)
+        self.count = (len(self.data) - HEADER) // self.recordSize
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("board index out of range")
+        start = HEADER + index * self.recordSize
+        return unpackBoard(self.data[start:start + self.recordSize], self.boxSize)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def grids(self, start=0, stop=None):
+        '''
+        Boards start to stop as a (boards, cells) uint8 NumPy array, 0 for
+        blanks, decoded with array operations.
+        '''
+        import numpy # only needed here
+        stop = self.count if stop == None else min(stop, self.count)
+        start = min(start, stop)
+        records = numpy.frombuffer(self.data, dtype=numpy.uint8, count=(stop - start) * self.recordSize,
+                                   offset=HEADER + start * self.recordSize).reshape(stop - start, self.recordSize)
+        if not isPacked(self.boxSize):
+            return records.copy()
+        cells = numpy.empty((stop - start, 2 * self.recordSize), dtype=numpy.uint8)
+        cells[:, 0::2] = records >> 4
+        cells[:, 1::2] = records & 15
+        return cells[:, :getGeometry(self.boxSize).cells]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+def pack(source, target):
+    '''
+    Convert the text puzzle file source (see PuzzleIO) to a packed file;
+    the box size is that of the first board.
+    '''
+    boards = PuzzleIO.readBoards(source)
+    try:
+        first = next(boards)
+    except StopIteration:
+        raise ValueError("%s holds no puzzles" % source)
+    return writePacked(chain([first], boards), target, boxSizeFor(len(first)))
+
+#Convert a packed file to the text format, written to target (a path, - for stdout)
+def unpack(source, target="-"):
+    packed = PackedCorpus(source)
+    try:
+        PuzzleIO.writeBoards(packed, target)
+    finally:
+        packed.close()
+    return len(packed)
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert puzzle files between the text and the packed format.")
+    parser.add_argument("command", choices=("pack", "unpack"))
+    parser.add_argument("source", help="file to read (- for stdin when packing)")
+    parser.add_argument("target", nargs="?", help="file to write (default: stdout when unpacking)")
+    arguments = parser.parse_args(argv)
+    try:
+        if arguments.command == "pack":
+            if arguments.target == None:
+                parser.error("pack needs a target file")
+            count = pack(arguments.source, arguments.target)
+        else:
+            count = unpack(arguments.source, arguments.target or "-")
+    except (IOError, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    print("%d boards" % count, file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
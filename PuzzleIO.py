@@ -0,0 +1,146 @@
+# Streaming reader and writer for puzzle files in the common text format:
+# one board per line, 81 characters, digits for givens and 0 or . for blanks.
+# Larger boards use the same format with one character per cell (256 for
+# 16x16, 625 for 25x25) and the letters A, B, C, ... for 10, 11, 12, ...
+# up to Z for 35, so boxes of 6x6 and more have no text form.
+# Anything after the first whitespace on a line is ignored, as are empty lines
+# and lines starting with #. Files ending in .gz are read and written gzipped,
+# and the path - stands for stdin/stdout.
+import gzip
+import sys
+from collections import deque
+
+from Geometry import boxSizeFor
+
+BLANKS = "0."
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ" # SYMBOLS[number - 1] stands for number
+
+def openPuzzleFile(path, mode="r"):
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    if path.endswith(".gz"):
+        if sys.version_info[0] < 3:
+            return gzip.open(path, mode + "b")
+        return gzip.open(path, mode + "t")
+    return open(path, mode)
+
+def readLines(source):
+    '''
+    Yield (line number, puzzle string) for every puzzle in source, which is
+    a path or an open file.
+    '''
+    puzzleFile = source
+    if not hasattr(source, "read"):
+        puzzleFile = openPuzzleFile(source)
+    try:
+        for number, line in enumerate(puzzleFile, 1):
+            fields = line.split()
+            if fields and not fields[0].startswith("#"):
+                yield number, fields[0]
+    finally:
+        if puzzleFile is not source and puzzleFile is not sys.stdin:
+            puzzleFile.close()
+
+def readBoards(source):
+    '''
+    Yield every board of source as a flat list of ints and "" blanks.
+    '''
+    for number, line in readLines(source):
+        try:
+            yield parseBoard(line)
+        except ValueError as error:
+            raise ValueError("line %d: %s" % (number, error))
+
+def parseBoard(line):
+    boxSize = boxSizeFor(len(line))
+    if boxSize == None:
+        raise ValueError("%d cells do not make a square board" % len(line))
+    size = boxSize * boxSize
+    if size > len(SYMBOLS):
+        raise ValueError("boards with %d numbers have no text form (at most %d)" % (size, len(SYMBOLS)))
+    board = []
+    for char in line.upper():
+        if char in BLANKS:
+            board.append("")
+        elif char in SYMBOLS[:size]:
+            board.append(SYMBOLS.index(char) + 1)
+        else:
+            raise ValueError("invalid cell %r" % char)
+    return board
+
+def formatBoard(board, blank="."):
+    if len(board) > len(SYMBOLS) ** 2:
+        raise ValueError("boards of %d cells have no text form" % len(board))
+    return "".join([blank if number == "" or number == 0 else SYMBOLS[number - 1] for number in board])
+
+#Multi-line layout for people: rows of "5 3 4 | 6 7 8 | 9 1 2" with rules between bands
+def formatGrid(board, blank="."):
+    line = formatBoard(board, blank)
+    boxSize = boxSizeFor(len(line))
+    size = boxSize * boxSize
+    rule = "+".join(["-" * (2 * boxSize + 1)] * boxSize)[1:-1]
+    rows = []
+    for row in range(size):
+        if row and row % boxSize == 0:
+            rows.append(rule)
+        cells = line[row * size:row * size + size]
+        rows.append(" | ".join([" ".join(cells[i:i + boxSize]) for i in range(0, size, boxSize)]))
+    return "\n".join(rows)
+
+def writeBoards(boards, target):
+    '''
+    Write every board of the iterable boards to target (a path or an open
+    file) as it arrives, one line per board.
+    '''
+    puzzleFile = target
+    if not hasattr(target, "write"):
+        puzzleFile = openPuzzleFile(target, "w")
+    try:
+        for board in boards:
+            puzzleFile.write(formatBoard(board) + "\n")
+    finally:
+        if puzzleFile is not target and puzzleFile is not sys.stdout:
+            puzzleFile.close()
+
+def solveFile(source, target, formatter=formatBoard, **options):
+    '''
+    Solve every puzzle of source and write the solutions to target, one
+    formatter(solution) per puzzle and in input order. A puzzle that cannot
+    be solved, or a line that is no puzzle, is written unchanged, followed
+    by "# " and the error. options are passed on to BatchSolver.solveBatch.
+    Returns the number of solved and failed puzzles.
+    '''
+    from BatchSolver import solveBatch # keeps multiprocessing out of plain reads and writes
+    options["ordered"] = True
+    lines = readLines(source)
+    puzzles = deque() # (line, parse error or None) sent to the workers but not written yet
+    def boards():
+        for number, line in lines:
+            try:
+                board = parseBoard(line)
+            except ValueError as error:
+                #An empty board keeps the results in line order; every backend rejects it at once
+                puzzles.append((line, "invalid puzzle: %s" % error))
+                yield []
+                continue
+            puzzles.append((line, None))
+            yield board
+    puzzleFile = target
+    if not hasattr(target, "write"):
+        puzzleFile = openPuzzleFile(target, "w")
+    solved = failed = 0
+    try:
+        for result in solveBatch(boards(), **options):
+            puzzle, error = puzzles.popleft()
+            error = error or result.error
+            if error == None:
+                puzzleFile.write(formatter(result.solution) + "\n")
+                solved += 1
+            else:
+                puzzleFile.write("%s # %s\n" % (puzzle, error))
+                failed += 1
+    finally:
+        if puzzleFile is not target and puzzleFile is not sys.stdout:
+            puzzleFile.close()
+    return solved, failed
+
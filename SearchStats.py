@@ -0,0 +1,50 @@
+# Counters of a single backtracking solve, started fresh by every solve.
+import time
+
+class SearchStats(object):
+
+    def __init__(self):
+        self.nodes = 0 # guesses tried
+        self.backtracks = 0 # guesses taken back
+        self.depth = 0 # guesses stacked right now, for watching a running solve
+        self.maxDepth = 0 # most guesses stacked at once
+        self.eliminations = 0 # candidates removed by locked candidates and naked pairs
+        self.branching = {} # number of candidates of a branching cell -> how often
+        self.phases = {} # phase -> seconds, only filled when profiling
+
+    #Record a branching cell at depth with count candidates
+    def branch(self, depth, count):
+        if depth > self.maxDepth:
+            self.maxDepth = depth
+        self.branching[count] = self.branching.get(count, 0) + 1
+
+    #Wrap method so that the time spent in it adds up under phase
+    def timed(self, phase, method):
+        phases = self.phases
+        phases.setdefault(phase, 0.0)
+        def timedMethod(*args):
+            start = time.time()
+            try:
+                return method(*args)
+            finally:
+                phases[phase] += time.time() - start
+        return timedMethod
+
+    def asDict(self, assigned, mistakes, seconds):
+        '''
+        The stats of a SolveResult: assigned and mistakes are the counters of
+        the solver, forced the assignments made by propagation rather than by
+        guessing.
+        '''
+        stats = {"assigned": assigned,
+                 "mistakes": mistakes,
+                 "time": seconds,
+                 "nodes": self.nodes,
+                 "backtracks": self.backtracks,
+                 "maxDepth": self.maxDepth,
+                 "forced": assigned - self.nodes,
+                 "eliminations": self.eliminations,
+                 "branching": dict(self.branching)}
+        if self.phases:
+            stats["phases"] = dict(self.phases)
+        return stats
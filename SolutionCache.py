@@ -0,0 +1,261 @@
+# Remembers solutions by the canonical form of the board, so a puzzle that was
+# already solved (or one equivalent to it) is answered without searching.
+#
+# Two boards are equivalent when one turns into the other by relabeling the
+# numbers, reordering the bands (groups of boxSize rows), reordering the
+# stacks (groups of boxSize columns) and/or transposing. The canonical form is
+# the smallest relabeled board over all those transforms; the transform that
+# produced it maps the cached solution back onto the board that was asked.
+import mmap
+import os
+import time
+from collections import OrderedDict
+from itertools import permutations
+
+from Geometry import boxSizeFor, getGeometry
+from Solver import getSolver
+from SolveResult import SolveResult, SOLVED, UNSOLVABLE, findConflicts
+
+#Band and stack orders grow as boxSize!, past this box size only transposition is tried
+MAX_PERMUTED_BOX_SIZE = 4
+
+MAGIC = b"SDKCACHE" # start of a cache file, followed by one byte for the box size
+HEADER = len(MAGIC) + 1
+
+_transforms = {}
+
+#Every transform as a tuple of cells: canonical cell i comes from board cell cells[i]
+def getTransforms(geometry):
+    if geometry.boxSize not in _transforms:
+        boxSize, size = geometry.boxSize, geometry.size
+        if boxSize <= MAX_PERMUTED_BOX_SIZE:
+            orders = list(permutations(range(boxSize)))
+        else:
+            orders = [tuple(range(boxSize))]
+        lines = [[group * boxSize + k for group in order for k in range(boxSize)] for order in orders]
+        transforms = set()
+        for rows in lines:
+            for cols in lines:
+                transforms.add(tuple([row * size + col for row in rows for col in cols]))
+                transforms.add(tuple([col * size + row for row in rows for col in cols]))
+        _transforms[geometry.boxSize] = sorted(transforms)
+    return _transforms[geometry.boxSize]
+
+def canonicalForm(board):
+    '''
+    Return (canonical, cells, labels) for a valid board: canonical is the
+    canonical board as a list, cells the transform (see getTransforms) and
+    labels[number] the canonical label of each number, so that
+    canonical[i] == labels[board[cells[i]]]. Blanks stay 0.
+    '''
+    geometry = getGeometry(boxSizeFor(len(board)))
+    board = [number or 0 for number in board]
+    best = bestCells = bestLabels = None
+    for cells in getTransforms(geometry):
+        #Numbers are labeled 1, 2, ... in order of first appearance; a
+        #transform is dropped as soon as it gets larger than the best one
+        labels = {0: 0}
+        relabeled = []
+        smaller = best == None
+        for cell in cells:
+            number = board[cell]
+            if number not in labels:
+                labels[number] = len(labels)
+            label = labels[number]
+            if not smaller:
+                other = best[len(relabeled)]
+                if label > other:
+                    break
+                smaller = label < other
+            relabeled.append(label)
+        else:
+            if smaller:
+                best, bestCells, bestLabels = relabeled, cells, labels
+    #Numbers missing from the board take the remaining labels in order
+    labels = [0] * (geometry.size + 1)
+    for number in range(geometry.size + 1):
+        if number not in bestLabels:
+            bestLabels[number] = len(bestLabels)
+        labels[number] = bestLabels[number]
+    return best, bestCells, labels
+
+#The solution of the original board from the solution of its canonical form
+def fromCanonical(solution, cells, labels):
+    numbers = [0] * len(labels)
+    for number, label in enumerate(labels):
+        numbers[label] = number
+    board = [0] * len(solution)
+    for i, cell in enumerate(cells):
+        board[cell] = numbers[solution[i]]
+    return board
+
+class SolutionCache(object):
+    '''
+    An LRU map from canonical boards to their canonical solutions, holding
+    at most maxSize entries in memory. With a path, the entries saved there
+    by save() are looked up too, through a memory-mapped file of sorted
+    fixed-size records (board, solution); an unsolvable board is saved with
+    an all-zero solution. A file holds boards of a single box size.
+    '''
+
+    def __init__(self, maxSize=10000, path=None):
+        self.maxSize = maxSize
+        self.path = path
+        self.entries = OrderedDict() # oldest first
+        self.hits = 0
+        self.misses = 0
+        self.file = self.index = None
+        self.boxSize = None
+        self.mapFile()
+
+    def mapFile(self):
+        path = self.path
+        if path == None or not os.path.exists(path) or os.path.getsize(path) <= HEADER:
+            return
+        self.file = open(path, "rb")
+        self.index = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.index[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("%s is not a solution cache" % path)
+        self.boxSize = bytearray(self.index[len(MAGIC):HEADER])[0]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        '''
+        The cached solution of the canonical board key (a bytes string),
+        b"" for a board known to be unsolvable or None when not cached.
+        '''
+        if key in self.entries:
+            value = self.entries.pop(key)
+            self.entries[key] = value
+        else:
+            value = self.lookup(key)
+            if value == None:
+                self.misses += 1
+                return None
+            self.put(key, value)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    #Binary search of the memory-mapped records
+    def lookup(self, key):
+        if self.index == None or len(key) != getGeometry(self.boxSize).cells:
+            return None
+        length = 2 * len(key)
+        low, high = 0, (len(self.index) - HEADER) // length
+        while low < high:
+            middle = (low + high) // 2
+            start = HEADER + middle * length
+            record = self.index[start:start + len(key)]
+            if record < key:
+                low = middle + 1
+            elif record > key:
+                high = middle
+            else:
+                value = self.index[start + len(key):start + length]
+                return b"" if value == bytes(bytearray(len(key))) else value
+        return None
+
+    def save(self, path=None):
+        '''
+        Write the saved records and the entries in memory to path (default:
+        the path of the cache), replacing the file. Only boards of the box
+        size of the file (or of the first entry for a new file) are written.
+        '''
+        path = path or self.path
+        records = {}
+        boxSize = self.boxSize
+        if self.index != None:
+            cells = getGeometry(boxSize).cells
+            for start in range(HEADER, len(self.index), 2 * cells):
+                records[self.index[start:start + cells]] = self.index[start + cells:start + 2 * cells]
+        for key, value in self.entries.items():
+            if boxSize == None:
+                boxSize = boxSizeFor(len(key))
+            if len(key) == getGeometry(boxSize).cells:
+                records[key] = value or bytes(bytearray(len(key)))
+        if boxSize == None:
+            return
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as output:
+            output.write(MAGIC + bytes(bytearray([boxSize])))
+            for key in sorted(records):
+                output.write(key + records[key])
+        if path == self.path:
+            self.close()
+        os.rename(temporary, path)
+        if path == self.path:
+            self.mapFile()
+
+    def close(self):
+        if self.index != None:
+            self.index.close()
+            self.file.close()
+        self.file = self.index = None
+
+class CachedSolver(object):
+    '''
+    Answers solve() from a SolutionCache and only runs the backend solver
+    on boards whose canonical form is not cached yet. Only SOLVED and
+    UNSOLVABLE results are cached; a cached solve ignores the options.
+    Boards with variant constraints go straight to the backend, since the
+    symmetries of the cache do not keep them.
+    The boards seen last are also remembered exactly as they were asked, so
+    asking one again skips the canonical form as well.
+    '''
+
+    def __init__(self, backend="backtracking", cache=None):
+        self.solver = getSolver(backend)
+        self.cache = cache if cache != None else SolutionCache()
+        self.recent = OrderedDict() # board -> its solution, b"" if unsolvable; oldest first
+
+    def remember(self, board, value):
+        self.recent.pop(board, None)
+        self.recent[board] = value
+        while len(self.recent) > self.cache.maxSize:
+            self.recent.popitem(last=False)
+
+    def solve(self, board, **options):
+        conflict = findConflicts(board)
+        if conflict or boxSizeFor(len(board)) ** 2 > 255 or options.get("constraints"):
+            return self.solver.solve(board, **options)
+        start = time.time()
+        raw = bytes(bytearray([number or 0 for number in board]))
+        value = self.recent.get(raw)
+        if value != None:
+            self.remember(raw, value)
+            self.cache.hits += 1
+            return self.cachedResult(value, start)
+        canonical, cells, labels = canonicalForm(board)
+        key = bytes(bytearray(canonical))
+        value = self.cache.get(key)
+        if value != None:
+            if value != b"":
+                value = bytes(bytearray(fromCanonical(list(bytearray(value)), cells, labels)))
+            self.remember(raw, value)
+            return self.cachedResult(value, start)
+        result = self.solver.solve(canonical, **options)
+        if result.status == SOLVED:
+            self.cache.put(key, bytes(bytearray(result.solution)))
+            result.solution = fromCanonical(result.solution, cells, labels)
+            self.remember(raw, bytes(bytearray(result.solution)))
+        elif result.status == UNSOLVABLE:
+            self.cache.put(key, b"")
+            self.remember(raw, b"")
+        result.stats["time"] = time.time() - start
+        return result
+
+    #The result of a board answered from the cache, value as in recent
+    def cachedResult(self, value, start):
+        stats = {"assigned": 0, "mistakes": 0, "time": time.time() - start, "cached": True}
+        if value == b"":
+            return SolveResult(UNSOLVABLE, stats=stats)
+        return SolveResult(SOLVED, list(bytearray(value)), stats)
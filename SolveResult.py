@@ -0,0 +1,51 @@
+# The outcome of solving one board, returned by every solver backend.
+from Geometry import boxSizeFor, getGeometry
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+INVALID = "invalid givens"
+TIMEOUT = "timeout"
+
+class SolveResult(object):
+
+    def __init__(self, status, solution=None, stats=None, message=None):
+        self.status = status # one of SOLVED, UNSOLVABLE, INVALID, TIMEOUT
+        self.solution = solution # the flat solved board, None unless SOLVED
+        self.stats = stats or {} # search counters of this solve
+        self.message = message # what is wrong with the givens for INVALID
+
+    def __repr__(self):
+        return "SolveResult(%r, message=%r, stats=%r)" % (self.status, self.message, self.stats)
+
+    def describe(self):
+        if self.message:
+            return "%s: %s" % (self.status, self.message)
+        return self.status
+
+#Check a board before searching it. Returns a description of the first
+#problem found (wrong size, bad cell, a number used twice in a unit) or None.
+#regions are the irregular boxes of a jigsaw board, see Geometry.
+def findConflicts(board, regions=None):
+    boxSize = boxSizeFor(len(board))
+    if boxSize == None:
+        return "%d cells do not make a square board" % len(board)
+    if regions != None and len(regions) != len(board):
+        return "%d regions given for %d cells" % (len(regions), len(board))
+    try:
+        geometry = getGeometry(boxSize, regions)
+    except ValueError as error:
+        return str(error)
+    for cell, number in enumerate(board):
+        if number != "" and number not in range(geometry.size + 1):
+            return "invalid cell %d: %r" % (cell, number)
+    for kind, units in (("row", geometry.rowUnits), ("column", geometry.colUnits), ("box", geometry.boxUnits)):
+        for index, cells in enumerate(units):
+            seen = set()
+            for cell in cells:
+                number = board[cell]
+                if number == "" or number == 0:
+                    continue
+                if number in seen:
+                    return "%d appears twice in %s %d" % (number, kind, index + 1)
+                seen.add(number)
+    return None
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# A local HTTP/JSON solving service (Python 3 only), e.g.
+#
+#   python3 SolveServer.py --port 8081
+#   curl -d '{"board": "1.......2.9.4...5...6...7...5.9.3..."}' localhost:8081/solve
+#
+# POST /solve takes a JSON object with either "board" (a string with one
+# character per cell, or a list of numbers with 0 for blanks) or "boards" (a
+# list of those), and optionally "timeLimit", "maxNodes" and "backend". A bare
+# board (a plain puzzle string or a JSON list) works too. The answer is one result object
+# {"status", "solution", "message", "stats"}, or {"results": [...]} for
+# "boards". GET /health reports the queue length.
+#
+# Solves run on a process pool. Boards wait in a bounded queue; when it is
+# full the request is refused with 503 instead of piling up, and a batch that
+# could never fit into the queue with 413.
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import PuzzleIO
+from Solver import BACKENDS, getSolver
+from SolveResult import INVALID, SOLVED
+
+MAX_BODY = 1 << 20 # bytes
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 503: "Service Unavailable"}
+
+class RequestError(Exception):
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+#Runs in the worker processes
+def solveJob(board, backend, limits):
+    result = getSolver(backend).solve(board, **limits)
+    return {"status": result.status,
+            "solution": PuzzleIO.formatBoard(result.solution) if result.status == SOLVED else None,
+            "message": result.message,
+            "stats": result.stats}
+
+def parseBoardValue(value):
+    '''
+    A board from a request: a puzzle string, or a list of numbers with 0 or
+    null for blanks. Raises ValueError when it is neither.
+    '''
+    if isinstance(value, str):
+        return PuzzleIO.parseBoard(value.strip())
+    if isinstance(value, list) and all(number is None or type(number) == int for number in value):
+        return [number or 0 for number in value]
+    raise ValueError("a board is a puzzle string or a list of numbers")
+
+class SolveService(object):
+    '''
+    Queues boards for solving and runs them on executor, with workers solves
+    in flight at a time. queueSize bounds the boards waiting; maxTimeLimit
+    caps (and by default sets) the time budget of every board.
+    '''
+
+    def __init__(self, executor, workers, queueSize=256, maxTimeLimit=10.0, maxBatch=1000):
+        self.executor = executor
+        self.workers = workers
+        self.queue = asyncio.Queue(queueSize)
+        self.maxTimeLimit = maxTimeLimit
+        self.maxBatch = maxBatch
+        self.dispatchers = []
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self.dispatchers = [loop.create_task(self.dispatch()) for worker in range(self.workers)]
+
+    async def stop(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+
+    #Take boards off the queue and solve them on the executor, one at a time
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            future, board, backend, limits = await self.queue.get()
+            try:
+                if not future.cancelled():
+                    result = await loop.run_in_executor(self.executor, solveJob, board, backend, limits)
+                    if not future.cancelled():
+                        future.set_result(result)
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_result({"status": "error", "solution": None,
+                                       "message": "%s: %s" % (type(error).__name__, error), "stats": {}})
+            finally:
+                self.queue.task_done()
+
+    async def solve(self, request):
+        '''
+        Answer a decoded /solve request (see the top of this file).
+        Raises RequestError for a request that cannot be served.
+        '''
+        if isinstance(request, (str, list)):
+            request = {"board": request}
+        if not isinstance(request, dict) or ("board" in request) == ("boards" in request):
+            raise RequestError(400, "give either \"board\" or \"boards\"")
+        backend = request.get("backend", "backtracking")
+        if backend not in BACKENDS:
+            raise RequestError(400, "unknown backend: %r" % (backend,))
+        limits = {"timeLimit": self.maxTimeLimit}
+        try:
+            if request.get("timeLimit") is not None:
+                timeLimit = float(request["timeLimit"])
+                if not (math.isfinite(timeLimit) and timeLimit > 0): # NaN would never run out
+                    raise ValueError
+                limits["timeLimit"] = min(timeLimit, self.maxTimeLimit)
+            if request.get("maxNodes") is not None:
+                limits["maxNodes"] = int(request["maxNodes"])
+        except (TypeError, ValueError, OverflowError):
+            raise RequestError(400, "timeLimit must be a positive number and maxNodes a whole number")
+        values = request["boards"] if "boards" in request else [request["board"]]
+        if not isinstance(values, list) or len(values) > self.maxBatch:
+            raise RequestError(400, "\"boards\" must be a list of at most %d boards" % self.maxBatch)
+        if len(values) > self.queue.maxsize:
+            raise RequestError(413, "a batch may hold at most %d boards here" % self.queue.maxsize)
+        if self.queue.maxsize - self.queue.qsize() < len(values):
+            raise RequestError(503, "too many boards waiting, try again later")
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for value in values:
+            future = loop.create_future()
+            try:
+                board = parseBoardValue(value)
+            except ValueError as error:
+                future.set_result({"status": INVALID, "solution": None, "message": str(error), "stats": {}})
+            else:
+                self.queue.put_nowait((future, board, backend, limits))
+            futures.append(future)
+        try:
+            results = await asyncio.gather(*futures)
+        finally:
+            for future in futures:
+                future.cancel() # boards of a dropped request are skipped by the dispatchers
+        if "boards" in request:
+            return {"results": results}
+        return results[0]
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                status, body = await self.respond(reader)
+            except RequestError as error:
+                status, body = error.status, {"error": str(error)}
+            data = json.dumps(body).encode("utf-8")
+            writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                          "Content-Length: %d\r\nConnection: close\r\n\r\n"
+                          % (status, REASONS[status], len(data))).encode("ascii") + data)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # the client went away
+        finally:
+            writer.close()
+
+    #Read one HTTP request and return (status, JSON body)
+    async def respond(self, reader):
+        requestLine = (await reader.readline()).decode("latin-1").split()
+        if len(requestLine) != 3:
+            raise RequestError(400, "malformed request line")
+        method, path = requestLine[0], requestLine[1].split("?")[0]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, separator, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if path == "/health":
+            return 200, {"status": "ok", "queued": self.queue.qsize(), "workers": self.workers}
+        if path != "/solve":
+            raise RequestError(404, "no such endpoint: %s" % path)
+        if method != "POST":
+            raise RequestError(405, "use POST for /solve")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise RequestError(400, "bad Content-Length")
+        if length < 0:
+            raise RequestError(400, "bad Content-Length")
+        if length > MAX_BODY:
+            raise RequestError(413, "the request is larger than %d bytes" % MAX_BODY)
+        body = await reader.readexactly(length)
+        try:
+            text = body.decode("utf-8").strip()
+            request = json.loads(text) if text[:1] in ("{", "[", "\"") else text
+        except UnicodeDecodeError:
+            raise RequestError(400, "the request body is not UTF-8")
+        except ValueError as error:
+            raise RequestError(400, "invalid JSON: %s" % error)
+        return 200, await self.solve(request)
+
+async def serve(host="127.0.0.1", port=8081, workers=None, queueSize=256, maxTimeLimit=10.0):
+    '''
+    Run the service until cancelled. workers is the number of solver
+    processes (default: one per core, 0 solves on one thread of this process).
+    '''
+    if workers == 0:
+        executor, workers = ThreadPoolExecutor(1), 1
+    else:
+        workers = workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(workers)
+    service = SolveService(executor, workers, queueSize, maxTimeLimit)
+    service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print("serving on http://%s:%d" % (host, port), file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        executor.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Sudoku solver over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="solver processes (default: one per core, 0 for none)")
+    parser.add_argument("--queue-size", type=int, default=256, help="boards that may wait for a worker")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="most seconds spent on one board")
+    arguments = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(arguments.host, arguments.port, arguments.workers,
+                          arguments.queue_size, arguments.time_limit))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,117 +1,520 @@
-# A class that represents a Sudoku Solver Algorithm 
-import sys
+# A class that represents a Sudoku Solver Algorithm
+import time
+from array import array
+
+from Budget import BudgetExceeded, makeBudget
+from Constraints import checkConstraints, getRegions
+from Geometry import boxSizeFor, getGeometry
+from SearchStats import SearchStats
+from SolveResult import SolveResult, SOLVED, UNSOLVABLE, INVALID, TIMEOUT
+
+#Branching heuristics: "scan" takes the first empty cell in row-major order,
+#"mrv" the cell with the fewest candidates and "mrv-degree" breaks MRV ties
+#by the number of empty peers.
+HEURISTICS = ("scan", "mrv", "mrv-degree")
 
 class Solver(object):
-    
-    def __init__(self):    
+
+    def __init__(self):
         self.mistakes = 0
         self.assigned  = 0
-        
-    def solve(self, board):
-        rows    = self.getRows(board) # get the rows of the board
-        columns = self.getColumns(rows) # get the columns of the board
-        boxes   = self.getBoxes(rows) # get the boxes
-        
+        self.hooked = [] # names of the methods shadowed by installHooks
+
+    def solve(self, board, propagate=True, lockedCandidates=False, nakedPairs=False, heuristic="mrv",
+              maxNodes=None, timeLimit=None, cancel=None, profile=False,
+              onAssign=None, onBacktrack=None, onSolution=None, constraints=None):
+        '''
+        board is a flat list of size ** 2 cells (81 for the classic 9x9, 256
+        for 16x16, ...) holding numbers and "" or 0 for blanks.
+        propagate turns naked/hidden singles on or off; lockedCandidates and
+        nakedPairs add the stronger (and slower) elimination rules.
+        heuristic picks the branching cell, see HEURISTICS.
+        maxNodes and timeLimit (seconds) bound the search and cancel takes a
+        Budget.CancelToken; when any of them stops the search the result has
+        the TIMEOUT status.
+        profile adds the time spent per search phase to the stats. onAssign
+        (cell, number), onBacktrack(cell, number) and onSolution(board) are
+        called on every assignment, on every guess taken back and on every
+        solution; hooks that are not given cost nothing.
+        constraints is a list of variant rules (see Constraints) that hold on
+        top of the rows, columns and boxes.
+        Returns a SolveResult whose stats are those of SearchStats.asDict.
+        '''
+        conflict = checkConstraints(board, constraints)
+        if conflict:
+            return SolveResult(INVALID, message=conflict)
+        start = time.time()
+        grid = self.prepare(board, propagate, lockedCandidates, nakedPairs, heuristic, maxNodes, timeLimit, cancel,
+                            profile, onAssign, onBacktrack, onSolution, constraints)
+
         #Solve the board
-        if self.solver(rows, columns, boxes):
-            return self.GenSolvedGrid(rows)
-        else:
-            print "Soduko not solvable"
-            sys.exit()
-
-    #Backtracking search with constraints. 
-    def solver(self, rows, columns, boxes):
-        row, col = self.getEmptyCell(rows)
-        if row == None and col == None:
+        try:
+            solved = self.solver(grid)
+        except BudgetExceeded as stop:
+            solved = None
+            reason = str(stop)
+        stats = self.stats.asDict(self.assigned, self.mistakes, time.time() - start)
+        if solved == None:
+            return SolveResult(TIMEOUT, stats=stats, message=reason)
+        if solved:
+            return SolveResult(SOLVED, self.GenSolvedGrid(grid), stats)
+        return SolveResult(UNSOLVABLE, stats=stats)
+
+    def solutions(self, board, limit=None, **options):
+        '''
+        Yield the solutions of board one at a time as flat lists, stopping
+        after limit solutions when limit is given. The search only advances
+        when the next solution is asked for. options are the keyword
+        arguments of solve; a budget that runs out raises
+        Budget.BudgetExceeded.
+        '''
+        if (limit != None and limit <= 0) or checkConstraints(board, options.get("constraints")):
+            return
+        grid = self.prepare(board, **options)
+        found = 0
+        for solved in self.search(grid):
+            yield self.GenSolvedGrid(grid)
+            found += 1
+            if limit != None and found >= limit:
+                return
+
+    def countSolutions(self, board, limit=None, **options):
+        '''
+        Return the number of solutions of board, counting no further than
+        limit. Same as counting solutions(board), but the solved grids are
+        never copied out of the search.
+        '''
+        if (limit != None and limit <= 0) or checkConstraints(board, options.get("constraints")):
+            return 0
+        grid = self.prepare(board, **options)
+        count = 0
+        for solved in self.search(grid):
+            count += 1
+            if limit != None and count >= limit:
+                break
+        return count
+
+    #True when board has exactly one solution
+    def isUnique(self, board, **options):
+        return self.countSolutions(board, 2, **options) == 1
+
+    #Set up the options, counters and masks of one solve and return the board as a grid
+    def prepare(self, board, propagate=True, lockedCandidates=False, nakedPairs=False, heuristic="mrv",
+                maxNodes=None, timeLimit=None, cancel=None, profile=False,
+                onAssign=None, onBacktrack=None, onSolution=None, constraints=None):
+        if heuristic not in HEURISTICS:
+            raise ValueError("unknown heuristic: %r" % (heuristic,))
+        setupStart = time.time()
+        self.mistakes = 0
+        self.assigned = 0
+        self.stats = SearchStats()
+        self.onBacktrack = onBacktrack
+        self.onSolution = onSolution
+        self.constraints = tuple(constraints or ())
+        self.installHooks(profile, onAssign)
+        self.geometry = getGeometry(boxSizeFor(len(board)), getRegions(self.constraints))
+        self.heuristic = heuristic
+        self.budget = makeBudget(maxNodes, timeLimit, cancel)
+        self.propagateSingles = propagate
+        self.lockedCandidates = lockedCandidates
+        self.nakedPairs = nakedPairs
+        grid = self.getGrid(board) # compact copy of the board, 0 for blanks
+        self.initMasks(grid) # record the numbers already used in every row, column and box
+        if self.constraints:
+            self.assignedSince = [(cell, grid[cell]) for cell in range(self.geometry.cells) if grid[cell]]
+            for constraint in self.constraints:
+                constraint.bind(self, self.geometry)
+                constraint.start(grid)
+        if profile:
+            self.stats.phases["setup"] = time.time() - setupStart
+        return grid
+
+    #Hooks and phase timers shadow the plain methods on this instance only while
+    #they are asked for, so a solve without them runs the class methods untouched.
+    def installHooks(self, profile, onAssign):
+        for name in self.hooked:
+            delattr(self, name)
+        self.hooked = []
+        if onAssign != None:
+            assignNumber = self.AssignNumber
+            def AssignNumber(grid, number, cell):
+                assignNumber(grid, number, cell)
+                onAssign(cell, number)
+            self.AssignNumber = AssignNumber
+            self.hooked.append("AssignNumber")
+        if self.constraints:
+            assignAndNotify = self.AssignNumber
+            def AssignNumber(grid, number, cell):
+                assignAndNotify(grid, number, cell)
+                self.assignedSince.append((cell, number)) # for propagateConstraints
+            self.AssignNumber = AssignNumber
+            if "AssignNumber" not in self.hooked:
+                self.hooked.append("AssignNumber")
+        if profile:
+            for name, phase in (("propagate", "propagate"), ("selectCell", "select"), ("undo", "undo")):
+                setattr(self, name, self.stats.timed(phase, getattr(self, name)))
+                self.hooked.append(name)
+
+    def solver(self, grid):
+        for solved in self.search(grid):
             return True #Sudoku is filled-out completely and is solved
-        for number in range(1, 10): #check all possible numbers that can be assigned
-            if self.checkRCB(rows, columns, boxes, number, row, col):
-                self.AssignNumber(rows, number, row, col) # Try assigning
-                columns, boxes = self.updateRCB(rows) #update the Rows, Columns and Boxes
-                if self.solver(rows, columns, boxes):
-                    return True
-                self.unAssignNumber(rows, number, row, col)
-                columns, boxes = self.updateRCB(rows) #update the Rows, Columns and Boxes
         return False
-                
+
+    #Backtracking search with constraints, driven by an explicit stack instead of
+    #recursion. Every change to the board goes onto one undo trail, and each stack
+    #frame remembers where its node and its current guess start on that trail:
+    #[nodeMark, guessMark, cell, candidates still to try].
+    #Yields each time grid holds a solution and backtracks for the next one when resumed.
+    def search(self, grid):
+        stats, onBacktrack, onSolution = self.stats, self.onBacktrack, self.onSolution
+        trail = []
+        stack = []
+        while True:
+            nodeMark = len(trail)
+            if self.propagate(grid, trail):
+                cell = self.selectCell(grid)
+                if cell == None:
+                    if onSolution != None:
+                        onSolution(list(grid))
+                    yield True
+                else:
+                    candidates = self.getCandidates(cell)
+                    stack.append([nodeMark, len(trail), cell, candidates])
+                    stats.branch(len(stack), self.bitCount[candidates])
+            else:
+                self.undo(grid, trail, nodeMark)
+            #Move on to the next number of the deepest node that has one left
+            while stack:
+                frame = stack[-1]
+                nodeMark, guessMark, cell, candidates = frame
+                if len(trail) > guessMark: # a guess of this frame is being taken back
+                    stats.backtracks += 1
+                    if onBacktrack != None:
+                        onBacktrack(cell, trail[guessMark][1])
+                self.undo(grid, trail, guessMark) # the last guess and everything it implied
+                if candidates:
+                    number = self.lowestNumber[candidates]
+                    frame[3] = candidates & (candidates - 1)
+                    if self.budget != None:
+                        self.budget.spend()
+                    stats.nodes += 1
+                    stats.depth = len(stack)
+                    self.AssignNumber(grid, number, cell) # Try assigning
+                    trail.append((cell, number))
+                    break
+                self.undo(grid, trail, nodeMark)
+                stack.pop()
+            else:
+                return
+
+    #Constraint propagation. Applies the enabled rules until none of them changes
+    #the board. Returns False as soon as a contradiction is found.
+    def propagate(self, grid, trail):
+        changed = self.propagateSingles or self.lockedCandidates or self.nakedPairs or self.constraints
+        while changed:
+            changed = False
+            if self.propagateSingles:
+                result = self.nakedSingles(grid, trail)
+                if result == None:
+                    return False
+                changed = result
+                if not changed:
+                    result = self.hiddenSingles(grid, trail)
+                    if result == None:
+                        return False
+                    changed = result
+            if not changed and self.constraints:
+                result = self.propagateConstraints(grid, trail)
+                if result == None:
+                    return False
+                changed = result
+            if not changed and self.lockedCandidates:
+                changed = self.eliminateLockedCandidates(grid, trail)
+            if not changed and self.nakedPairs:
+                changed = self.eliminateNakedPairs(grid, trail)
+        return True
+
+    #Hand the assignments made since the last call to every constraint.
+    #Returns None on a contradiction, otherwise whether anything changed.
+    def propagateConstraints(self, grid, trail):
+        assigned, self.assignedSince = self.assignedSince, []
+        changed = False
+        for constraint in self.constraints:
+            result = constraint.propagate(grid, assigned, trail)
+            if result == None:
+                return None
+            changed = result or changed
+        return changed
+
+    #Fill every empty cell that has only one candidate left.
+    #Returns None on a cell without candidates, otherwise whether anything was filled.
+    def nakedSingles(self, grid, trail):
+        if self.buckets != None:
+            return self.nakedSinglesFromBuckets(grid, trail)
+        changed = False
+        for cell in range(self.geometry.cells):
+            if grid[cell] == 0:
+                candidates = self.getCandidates(cell)
+                if not candidates:
+                    return None
+                if not candidates & (candidates - 1):
+                    number = candidates.bit_length()
+                    self.AssignNumber(grid, number, cell)
+                    trail.append((cell, number))
+                    changed = True
+        return changed
+
+    #Same as nakedSingles, but reads the cells straight from the candidate count buckets.
+    def nakedSinglesFromBuckets(self, grid, trail):
+        changed = False
+        while self.buckets[1]:
+            if self.buckets[0]:
+                return None
+            cell = next(iter(self.buckets[1]))
+            number = self.getCandidates(cell).bit_length()
+            self.AssignNumber(grid, number, cell)
+            trail.append((cell, number))
+            changed = True
+        if self.buckets[0]:
+            return None
+        return changed
+
+    #Fill every number that has only one possible cell left in some unit (of
+    #units, by default all rows, columns and boxes).
+    #Returns None on a number without a cell, otherwise whether anything was filled.
+    def hiddenSingles(self, grid, trail, units=None):
+        changed = False
+        allNumbers = self.geometry.allNumbers
+        for unit in units or self.geometry.units:
+            placed = once = twice = 0
+            for cell in unit:
+                if grid[cell]:
+                    placed |= 1 << (grid[cell] - 1)
+                else:
+                    candidates = self.getCandidates(cell)
+                    twice |= once & candidates
+                    once |= candidates
+            if (placed | once) != allNumbers:
+                return None
+            singles = once & ~twice & ~placed
+            while singles:
+                number = self.lowestNumber[singles]
+                bit = 1 << (number - 1)
+                singles ^= bit
+                for cell in unit:
+                    if grid[cell] == 0 and self.getCandidates(cell) & bit:
+                        break
+                else:
+                    return None # its only cell was just taken by another single
+                self.AssignNumber(grid, number, cell)
+                trail.append((cell, number))
+                changed = True
+        return changed
+
+    #Pointing and claiming: when a number's candidates in one unit all lie inside
+    #a second unit, the number can be removed from the rest of the second unit.
+    def eliminateLockedCandidates(self, grid, trail):
+        changed = False
+        for inside, boxRest, lineRest in self.geometry.intersections:
+            numbers = self.getUnitCandidates(grid, inside)
+            if not numbers:
+                continue
+            boxNumbers = self.getUnitCandidates(grid, boxRest)
+            lineNumbers = self.getUnitCandidates(grid, lineRest)
+            pointing = numbers & ~boxNumbers & lineNumbers
+            if pointing:
+                changed = self.eliminate(grid, lineRest, pointing, trail) or changed
+            claiming = numbers & ~lineNumbers & boxNumbers
+            if claiming:
+                changed = self.eliminate(grid, boxRest, claiming, trail) or changed
+        return changed
+
+    #Two cells of a unit that share the same two candidates take both numbers,
+    #so those numbers can be removed from every other cell of the unit.
+    def eliminateNakedPairs(self, grid, trail):
+        changed = False
+        for unit in self.geometry.units:
+            seen = {}
+            for cell in unit:
+                if grid[cell]:
+                    continue
+                candidates = self.getCandidates(cell)
+                if self.bitCount[candidates] != 2:
+                    continue
+                if candidates in seen:
+                    pair = (seen[candidates], cell)
+                    others = [other for other in unit if other not in pair]
+                    changed = self.eliminate(grid, others, candidates, trail) or changed
+                else:
+                    seen[candidates] = cell
+        return changed
+
+    #All candidates of the empty cells among cells
+    def getUnitCandidates(self, grid, cells):
+        numbers = 0
+        for cell in cells:
+            if grid[cell] == 0:
+                numbers |= self.getCandidates(cell)
+        return numbers
+
+    def eliminate(self, grid, cells, bits, trail):
+        changed = False
+        for cell in cells:
+            removed = grid[cell] == 0 and self.getCandidates(cell) & bits
+            if removed:
+                self.stats.eliminations += self.bitCount[removed]
+                trail.append((cell, self.eliminated[cell]))
+                self.eliminated[cell] |= bits
+                self.updateCount(cell)
+                changed = True
+        return changed
+
+    #Revert the trail back to its first mark entries, newest change first.
+    def undo(self, grid, trail, mark=0):
+        while len(trail) > mark:
+            cell, value = trail.pop()
+            if grid[cell] == 0:
+                self.eliminated[cell] = value # an elimination mask
+                self.updateCount(cell)
+            else:
+                self.unAssignNumber(grid, value, cell)
+
+    def selectCell(self, grid):
+        if self.buckets == None:
+            return self.getEmptyCell(grid)
+        for bucket in self.buckets: # a cell in buckets[0] has no candidates and fails at once
+            if bucket:
+                if self.heuristic == "mrv" or len(bucket) == 1:
+                    return next(iter(bucket))
+                return max(bucket, key=lambda cell: self.getDegree(grid, cell))
+        return None
+
+    #Number of empty cells sharing a unit with cell
+    def getDegree(self, grid, cell):
+        return len([1 for peer in self.geometry.peers[cell] if grid[peer] == 0])
+
     def getEmptyCell(self, grid):
-        for row in range(9):
-            for col in range(9):
-                if grid[row][col] == "":
-                    return row, col
-        return None, None
-                
-    def unAssignNumber(self, grid, number, row, col):
-        grid[row][col] = ""
+        for cell in range(self.geometry.cells):
+            if grid[cell] == 0:
+                return cell
+        return None
+
+    def unAssignNumber(self, grid, number, cell):
+        grid[cell] = 0
+        bit = ~(1 << (number - 1))
+        self.rowMasks[self.rowOf[cell]] &= bit
+        self.colMasks[self.colOf[cell]] &= bit
+        self.boxMasks[self.boxOf[cell]] &= bit
+        if self.buckets != None:
+            self.updateCount(cell)
+            self.updatePeerCounts(grid, cell)
         self.mistakes += 1
-        
-    def AssignNumber(self, grid, number, row, col):
-        grid[row][col] = number
+
+    def AssignNumber(self, grid, number, cell):
+        grid[cell] = number
+        bit = 1 << (number - 1)
+        self.rowMasks[self.rowOf[cell]] |= bit
+        self.colMasks[self.colOf[cell]] |= bit
+        self.boxMasks[self.boxOf[cell]] |= bit
+        if self.buckets != None:
+            self.buckets[self.counts[cell]].discard(cell)
+            self.counts[cell] = None
+            self.updatePeerCounts(grid, cell)
         self.assigned += 1
 
-    #Constraints check. (A check whether a number is already in that row, column, or box) 
-    def checkRCB(self, rows, columns, boxes, number, row, col):
+    #Constraints check. (A check whether a number is already in that row, column, or box)
+    def checkRCB(self, number, cell):
         '''
         Return True if no conflicts found
         '''
-        return number not in columns[col] and \
-                number not in rows[row] and \
-                self.checkBox(boxes, number, row, col)
-    
-    def checkBox(self, boxes, number, row, col):
-        if row <= 2 and col <= 2:
-            return number not in boxes[0]
-        elif row <= 2 and 3 <= col <= 5:
-            return number not in boxes[3]
-        elif row <= 2 and 6 <= col <= 8:
-            return number not in boxes[6]
-        elif 3 <= row <= 5 and col <= 2:
-            return number not in boxes[1]
-        elif 3 <= row <= 5 and 3 <= col <= 5:
-            return number not in boxes[4]
-        elif 3 <= row <= 5 and 6 <= col <= 8:
-            return number not in boxes[7]
-        elif 6 <= row <= 8 and col <= 2:
-            return number not in boxes[2]
-        elif 6 <= row <= 8 and 3 <= col <= 5:
-            return number not in boxes[5]
-        elif 6 <= row <= 8 and 6 <= col <= 8:
-            return number not in boxes[8]   
-    
-    def getRows(self, board):
-        rows = []
-        for i in range(0, 73, 9):
-            row = board[i:i+9]
-            rows.append(row)
-        return rows
-            
-    def getColumns(self, board):
-        columns = []
-        for i in range(0,9):
-            columns.append([x[i] for x in board])
-        return columns
-        
-    def getBoxes(self, boardByRows):
-        boxes = []
-        for j in range(0, 9, 3):
-            TopLevelBoxes = []
-            MiddleLevelBoxes = []
-            BottomLevelBoxes = []
-            for i in range(0, 3):
-                TopLevelBoxes = TopLevelBoxes + boardByRows[i][j:j+3]
-                MiddleLevelBoxes = MiddleLevelBoxes + boardByRows[i+3][j:j+3]
-                BottomLevelBoxes = BottomLevelBoxes + boardByRows[i+6][j:j+3]
-            boxes.append(TopLevelBoxes)
-            boxes.append(MiddleLevelBoxes)
-            boxes.append(BottomLevelBoxes)
-        return boxes
-    
-    def updateRCB(self, rows):
-        columns = self.getColumns(rows)
-        boxes   = self.getBoxes(rows)
-        return columns, boxes
-        
+        return bool(self.getCandidates(cell) & (1 << (number - 1)))
+
+    #Bitmask of the numbers that can still go into an empty cell
+    def getCandidates(self, cell):
+        used = self.rowMasks[self.rowOf[cell]] | self.colMasks[self.colOf[cell]] | self.boxMasks[self.boxOf[cell]]
+        return self.geometry.allNumbers & ~(used | self.eliminated[cell])
+
+    #Candidate count buckets: buckets[k] holds the empty cells with k candidates,
+    #so the MRV cell is found without scanning the board. They are only kept
+    #when a MRV heuristic is selected.
+    def initBuckets(self, grid):
+        self.buckets = None
+        if self.heuristic == "scan":
+            return
+        self.counts = [None] * self.geometry.cells
+        self.buckets = [set() for count in range(self.geometry.size + 1)]
+        for cell in range(self.geometry.cells):
+            if grid[cell] == 0:
+                self.updateCount(cell)
+
+    def updateCount(self, cell):
+        if self.buckets == None:
+            return
+        count = self.bitCount[self.getCandidates(cell)]
+        old = self.counts[cell]
+        if old != count:
+            if old != None:
+                self.buckets[old].discard(cell)
+            self.buckets[count].add(cell)
+            self.counts[cell] = count
+
+    #updateCount for every empty peer of cell, with the lookups hoisted out of the loop
+    def updatePeerCounts(self, grid, cell):
+        rowMasks, colMasks, boxMasks, eliminated = self.rowMasks, self.colMasks, self.boxMasks, self.eliminated
+        rowOf, colOf, boxOf = self.rowOf, self.colOf, self.boxOf
+        bitCount, counts, buckets = self.bitCount, self.counts, self.buckets
+        allNumbers = self.geometry.allNumbers
+        for peer in self.geometry.peers[cell]:
+            if grid[peer] == 0:
+                used = rowMasks[rowOf[peer]] | colMasks[colOf[peer]] | boxMasks[boxOf[peer]] | eliminated[peer]
+                count = bitCount[allNumbers & ~used]
+                old = counts[peer]
+                if old != count:
+                    if old != None:
+                        buckets[old].discard(peer)
+                    buckets[count].add(peer)
+                    counts[peer] = count
+
+    #Occupancy masks: bit (number - 1) is set when number is used in that row, column or box.
+    #They are built once per solve and then kept up to date by AssignNumber/unAssignNumber.
+    #eliminated holds, per cell, the numbers ruled out by locked candidates and naked pairs.
+    def initMasks(self, grid):
+        geometry = self.geometry
+        self.rowOf, self.colOf, self.boxOf = geometry.rowOf, geometry.colOf, geometry.boxOf
+        self.bitCount, self.lowestNumber = geometry.bitCount, geometry.lowestNumber
+        self.rowMasks = [0] * geometry.size
+        self.colMasks = [0] * geometry.size
+        self.boxMasks = [0] * geometry.size
+        self.eliminated = [0] * geometry.cells
+        for cell in range(geometry.cells):
+            number = grid[cell]
+            if number:
+                bit = 1 << (number - 1)
+                self.rowMasks[self.rowOf[cell]] |= bit
+                self.colMasks[self.colOf[cell]] |= bit
+                self.boxMasks[self.boxOf[cell]] |= bit
+        self.initBuckets(grid)
+
+    #The board as a flat array of small ints, 0 for blanks
+    def getGrid(self, board):
+        typecode = "B" if self.geometry.size < 256 else "H"
+        return array(typecode, [0 if number == "" else number for number in board])
+
     def GenSolvedGrid(self, grid):
-        return [item for sublist in grid for item in sublist]
-    
-                
+        return list(grid)
+
+
+#Solving backends that share the solve(board) contract. "numpy" needs NumPy and
+#solves whole lists of boards at once through solveBoards.
+BACKENDS = ("backtracking", "dlx", "numpy")
+
+def getSolver(backend="backtracking"):
+    if backend == "backtracking":
+        return Solver()
+    if backend == "dlx":
+        from DLXSolver import DLXSolver
+        return DLXSolver()
+    if backend == "numpy":
+        from VectorSolver import VectorSolver
+        return VectorSolver()
+    raise ValueError("unknown backend: %r" % (backend,))
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+# Command line front end for the Sudoku solvers. Unlike SudokuPuzzle.py it
+# never imports graphics, so it runs without Tkinter or a display.
+#
+#   SudokuCLI.py 53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79
+#   SudokuCLI.py -f puzzles.txt.gz -o solutions.txt --workers 4 --time
+#   SudokuCLI.py --generate 1000 --seed 42 --givens 22-26 --difficulty hard -o puzzles.txt
+#   SudokuCLI.py --grade -f puzzles.txt -o grades.txt
+#   SudokuCLI.py --diagonals 1..4..8.....3....7........5.....1.5..4.....7....82.......2..7.36........9........
+#   SudokuCLI.py --gui
+from __future__ import print_function
+
+import argparse
+import sys
+import time
+
+import Generator
+import PuzzleIO
+from Constraints import Diagonals, Jigsaw, parseRegions
+from Generator import DIFFICULTIES
+from Solver import BACKENDS, getSolver
+from SolveResult import SOLVED
+
+FORMATTERS = {"line": PuzzleIO.formatBoard, "grid": PuzzleIO.formatGrid}
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Solve or generate Sudoku puzzles without the GUI.")
+    parser.add_argument("puzzle", nargs="?", help="a single puzzle, one character per cell")
+    parser.add_argument("-f", "--file", help="solve every puzzle of this file (- for stdin, .gz is allowed)")
+    parser.add_argument("-o", "--output", default="-", help="where to write the solutions (default: stdout)")
+    parser.add_argument("-b", "--backend", choices=BACKENDS, default="backtracking")
+    parser.add_argument("--format", choices=sorted(FORMATTERS), default="line")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --file and --generate (default: one per core, 0 for none)")
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--time-limit", type=float, default=None, help="give up on a puzzle after this many seconds")
+    parser.add_argument("--max-nodes", type=int, default=None, help="give up on a puzzle after this many search nodes")
+    parser.add_argument("--all", action="store_true", help="print every solution of the puzzle, not just one")
+    parser.add_argument("--count", action="store_true", help="print the number of solutions of the puzzle")
+    parser.add_argument("--limit", type=int, default=None, help="stop --all and --count after this many solutions")
+    parser.add_argument("--time", action="store_true", help="report the solve time on stderr")
+    parser.add_argument("--stats", action="store_true", help="report the search statistics of a single puzzle on stderr")
+    parser.add_argument("--grade", action="store_true",
+                        help="grade the puzzle(s) by the techniques a person would need instead of solving")
+    parser.add_argument("--gui", action="store_true", help="open the graphical solver instead")
+    variants = parser.add_argument_group("variants (a single puzzle, backtracking backend)")
+    variants.add_argument("--diagonals", action="store_true", help="X-Sudoku: the diagonals hold every number once")
+    variants.add_argument("--regions", metavar="LAYOUT",
+                          help="jigsaw regions, one character per cell naming its region")
+    generator = parser.add_argument_group("generating puzzles")
+    generator.add_argument("--generate", type=int, metavar="COUNT", help="generate COUNT puzzles instead of solving")
+    generator.add_argument("--seed", type=int, default=0)
+    generator.add_argument("--givens", metavar="MIN-MAX", help="range for the number of givens")
+    generator.add_argument("--difficulty", choices=DIFFICULTIES)
+    generator.add_argument("--symmetric", action="store_true", help="remove givens in symmetric pairs")
+    generator.add_argument("--box-size", type=int, default=3)
+    arguments = parser.parse_args(argv)
+    if arguments.givens != None:
+        try:
+            arguments.givens = tuple([int(count) for count in arguments.givens.split("-")])
+            if len(arguments.givens) != 2:
+                raise ValueError
+        except ValueError:
+            parser.error("--givens takes a range like 22-26")
+    sources = [arguments.puzzle != None, arguments.file != None, arguments.generate != None]
+    if not arguments.gui and sources.count(True) != 1:
+        parser.error("give either a puzzle, --file or --generate")
+    if (arguments.all or arguments.count) and arguments.puzzle == None:
+        parser.error("--all and --count work on a single puzzle")
+    if arguments.limit != None and arguments.limit < 1:
+        parser.error("--limit must be at least 1")
+    if (arguments.diagonals or arguments.regions) and (arguments.puzzle == None or arguments.backend != "backtracking"):
+        parser.error("--diagonals and --regions work on a single puzzle with the backtracking backend")
+    return arguments
+
+def solvePuzzle(arguments):
+    try:
+        board = PuzzleIO.parseBoard(arguments.puzzle)
+    except ValueError as error:
+        print("invalid puzzle: %s" % error, file=sys.stderr)
+        return 0, 1
+    if arguments.all or arguments.count:
+        return enumerateSolutions(board, arguments)
+    options = getVariantOptions(arguments)
+    if arguments.stats and arguments.backend == "backtracking":
+        options["profile"] = True
+    result = getSolver(arguments.backend).solve(board, maxNodes=arguments.max_nodes, timeLimit=arguments.time_limit,
+                                                **options)
+    if arguments.stats:
+        for name in sorted(result.stats):
+            print("%s: %s" % (name, result.stats[name]), file=sys.stderr)
+    if result.status != SOLVED:
+        print("not solved: %s" % result.describe(), file=sys.stderr)
+        return 0, 1
+    output = PuzzleIO.openPuzzleFile(arguments.output, "w")
+    output.write(FORMATTERS[arguments.format](result.solution) + "\n")
+    if output is not sys.stdout:
+        output.close()
+    return 1, 0
+
+#The constraints option for --diagonals and --regions
+def getVariantOptions(arguments):
+    constraints = []
+    if arguments.diagonals:
+        constraints.append(Diagonals())
+    if arguments.regions:
+        constraints.append(Jigsaw(parseRegions(arguments.regions)))
+    return {"constraints": constraints} if constraints else {}
+
+def enumerateSolutions(board, arguments):
+    solver = getSolver(arguments.backend)
+    options = getVariantOptions(arguments)
+    if arguments.count:
+        print(solver.countSolutions(board, arguments.limit, **options))
+        return 1, 0
+    output = PuzzleIO.openPuzzleFile(arguments.output, "w")
+    found = 0
+    for solution in solver.solutions(board, arguments.limit, **options):
+        output.write(FORMATTERS[arguments.format](solution) + "\n")
+        found += 1
+    if output is not sys.stdout:
+        output.close()
+    if not found:
+        print("no solution", file=sys.stderr)
+        return 0, 1
+    return found, 0
+
+#Technique counts in order of first use, e.g. "hidden single x40, x-wing x1"
+def formatTechniques(techniques):
+    counts = {}
+    for name in techniques:
+        counts[name] = counts.get(name, 0) + 1
+    order = sorted(counts, key=techniques.index)
+    return ", ".join(["%s x%d" % (name, counts[name]) for name in order])
+
+def gradePuzzles(arguments):
+    from LogicSolver import gradeBoard
+    output = PuzzleIO.openPuzzleFile(arguments.output, "w")
+    graded = failed = 0
+    try:
+        lines = [(1, arguments.puzzle)] if arguments.puzzle != None else PuzzleIO.readLines(arguments.file)
+        for number, line in lines:
+            try:
+                grade = gradeBoard(PuzzleIO.parseBoard(line))
+            except ValueError as error:
+                output.write("%s # invalid puzzle: %s\n" % (line, error))
+                failed += 1
+                continue
+            if grade.status != SOLVED:
+                output.write("%s # %s\n" % (line, grade.message or grade.status))
+                failed += 1
+            else:
+                output.write("%s %.1f %s\n" % (line, grade.score, formatTechniques(grade.techniques)))
+                graded += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return graded, failed
+
+def generatePuzzles(arguments):
+    puzzles = Generator.generatePuzzles(arguments.generate, arguments.seed, arguments.workers,
+                              boxSize=arguments.box_size, givens=arguments.givens,
+                              difficulty=arguments.difficulty, symmetric=arguments.symmetric)
+    output = PuzzleIO.openPuzzleFile(arguments.output, "w")
+    generated = failed = 0
+    try:
+        for index, puzzle, solution in puzzles:
+            if puzzle == None:
+                print("puzzle %d: no puzzle found with these constraints" % index, file=sys.stderr)
+                failed += 1
+            else:
+                output.write(FORMATTERS[arguments.format](puzzle) + "\n")
+                generated += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return generated, failed
+
+def main(argv=None):
+    arguments = parseArguments(argv)
+    if arguments.gui:
+        import SudokuPuzzle
+        SudokuPuzzle.main()
+        return 0
+    start = time.time()
+    if arguments.generate != None:
+        solved, failed = generatePuzzles(arguments)
+    elif arguments.grade:
+        solved, failed = gradePuzzles(arguments)
+    elif arguments.puzzle != None:
+        solved, failed = solvePuzzle(arguments)
+    else:
+        solved, failed = PuzzleIO.solveFile(arguments.file, arguments.output,
+                                            formatter=FORMATTERS[arguments.format],
+                                            backend=arguments.backend,
+                                            workers=arguments.workers,
+                                            chunkSize=arguments.chunk_size,
+                                            maxNodes=arguments.max_nodes,
+                                            timeLimit=arguments.time_limit)
+    if arguments.time:
+        elapsed = time.time() - start
+        print("%d done, %d failed in %.3fs (%.1f puzzles/s)"
+              % (solved, failed, elapsed, (solved + failed) / max(elapsed, 1e-9)), file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
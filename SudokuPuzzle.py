@@ -3,9 +3,40 @@
 # Anton Stoytchev
 # 04/08/2013
 
+import threading
+import time
+
+from Budget import CancelToken
 from Solver import Solver
+from SolveResult import SOLVED, TIMEOUT
 import graphics
 
+#Runs one solve on a background thread so the window keeps updating; the
+#display loop polls it for progress and the result.
+class SolveTask(threading.Thread):
+
+    def __init__(self, board):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.board = board
+        self.solver = Solver()
+        self.cancelToken = CancelToken()
+        self.result = None
+        self.start()
+
+    def run(self):
+        self.result = self.solver.solve(self.board, cancel=self.cancelToken)
+
+    def cancel(self):
+        self.cancelToken.cancel()
+
+    #(nodes, current depth) of the running search
+    def getProgress(self):
+        stats = getattr(self.solver, "stats", None)
+        if stats == None:
+            return 0, 0
+        return stats.nodes, stats.depth
+
 def getSudoku(boxes):
     sudokulist = []
     for box in boxes:
@@ -27,10 +58,9 @@ def ShiftBoxes(shift):
         shift = shift + 5
     return shift
 
-if __name__ == '__main__':
+def main():
     display = graphics.Display("white", 306, 320)        
     boxes = []
-    solver = Solver()
     
     #make the Sudoku Board
     for x in range(0, 180, 20):
@@ -42,8 +72,10 @@ if __name__ == '__main__':
     #Generate a Black background for the dividing lines
     Rectangle = graphics.Rectangle('black', 65, 40, 255, 230)
         
-    #make a Solve! Button
+    #make a Solve! Button and a Cancel button for long solves
     SolvPuzzle = graphics.Button("Solve Puzzle", "white", 165, 250, 250, 270)
+    CancelSolve = graphics.Button("Cancel", "white", 70, 250, 155, 270)
+    Progress = graphics.Text("", 160, 295, "black", 10)
     
     #Display the board
     for box in boxes:
@@ -51,22 +83,50 @@ if __name__ == '__main__':
         
     #Display all objects
     display.add(SolvPuzzle)
+    display.add(CancelSolve)
+    display.add(Progress)
     display.add(Rectangle)
     display.draw()
     
-    #Event handler to slide clicked tiles
+    running = {} # the SolveTask in progress, with the nodes and time of the last poll
+    
+    #Event handler for the buttons
     def on_left_click(point):
-        if SolvPuzzle.contains(point.x, point.y):
-            sudokulist = getSudoku(boxes)
-            solution = solver.solve(sudokulist)
-            PrintPuzzle(boxes, solution)
+        if SolvPuzzle.contains(point.x, point.y) and not running:
+            running["task"] = SolveTask(getSudoku(boxes))
+            running["nodes"], running["time"] = 0, time.time()
+            Progress.set_text("Solving...")
+        elif CancelSolve.contains(point.x, point.y) and running:
+            running["task"].cancel()
     display.set_left_click_handler(on_left_click)
     
+    #Called from the display loop: show the progress, then the result once the solve is done
+    def poll():
+        task = running["task"]
+        if task.is_alive():
+            nodes, depth = task.getProgress()
+            now = time.time()
+            rate = (nodes - running["nodes"]) / max(now - running["time"], 1e-3)
+            running["nodes"], running["time"] = nodes, now
+            Progress.set_text("%d nodes, %d nodes/s, depth %d" % (nodes, rate, depth))
+            return
+        del running["task"]
+        result = task.result
+        if result.status == SOLVED:
+            PrintPuzzle(boxes, result.solution)
+            Progress.set_text("Solved in %.2fs, %d nodes" % (result.stats["time"], result.stats["nodes"]))
+        elif result.status == TIMEOUT:
+            Progress.set_text("Cancelled")
+        else:
+            Progress.set_text("Not solved: " + result.status)
+            print("Sudoku not solved: " + result.describe())
+    
     while display.is_open():
         display.update(100)
-            
-    
-    
+        if running and display.is_open():
+            poll()
+    if running:
+        running["task"].cancel()
 
-    
-    
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# Solves batches of boards with NumPy. The candidates of every cell of every
+# board in the batch are computed at once, and naked and hidden singles are
+# applied to the whole batch until nothing changes. Only the boards that
+# still have blanks after that go through the scalar Solver one by one.
+#
+# NumPy is optional: the rest of the project works without it, and creating a
+# VectorSolver without it raises ImportError.
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from Geometry import boxSizeFor, getGeometry
+from Solver import Solver
+from SolveResult import SolveResult, SOLVED, UNSOLVABLE, INVALID, findConflicts
+
+MAX_BOX_SIZE = 5 # candidates of larger boards do not fit the uint32 masks; those go to Solver
+
+class VectorSolver(object):
+
+    def __init__(self):
+        if numpy == None:
+            raise ImportError("VectorSolver needs NumPy")
+        self.mistakes = 0
+        self.assigned  = 0
+
+    def solve(self, board, **options):
+        return self.solveBoards([board], **options)[0]
+
+    #Enumeration is left to Solver, batching does not help there
+    def solutions(self, board, limit=None, **options):
+        return Solver().solutions(board, limit, **options)
+
+    def countSolutions(self, board, limit=None, **options):
+        return Solver().countSolutions(board, limit, **options)
+
+    def isUnique(self, board, **options):
+        return Solver().isUnique(board, **options)
+
+    def solveScalar(self, board, options):
+        scalar = Solver()
+        result = scalar.solve(board, **options)
+        self.mistakes += scalar.mistakes
+        self.assigned += scalar.assigned
+        return result
+
+    def solveBoards(self, boards, **options):
+        '''
+        Solve a list of boards, or a (boards, cells) NumPy array of them like
+        PackedBoards.PackedCorpus.grids returns, and return a SolveResult per
+        board, in order. options are the keyword arguments of Solver.solve,
+        used for the boards that propagation alone does not finish. Boards
+        with variant constraints all go to Solver, since the batch
+        propagation only knows rows, columns and boxes.
+        '''
+        if options.get("constraints"):
+            return [self.solveScalar(board.tolist() if isinstance(boards, numpy.ndarray) else board, options)
+                    for board in boards]
+        results = [None] * len(boards)
+        if isinstance(boards, numpy.ndarray):
+            groups = [(boxSizeFor(boards.shape[1]), list(range(len(boards))), boards)]
+        else:
+            bySize = {} # boards of one box size share one array
+            for index, board in enumerate(boards):
+                bySize.setdefault(boxSizeFor(len(board)), []).append(index)
+            groups = [(boxSize, indices, toArray([boards[index] for index in indices]))
+                      for boxSize, indices in bySize.items()]
+        for boxSize, indices, grids in groups:
+            if boxSize == None or boxSize > MAX_BOX_SIZE or grids is None:
+                for row, index in enumerate(indices):
+                    board = boards[index] if grids is None else grids[row].tolist()
+                    results[index] = self.solveScalar(board, options)
+            else:
+                self.solveGroup(grids, indices, getGeometry(boxSize), results, options)
+        return results
+
+    #Solve the boards of grids (one box size) into results[indices[row]]
+    def solveGroup(self, grids, indices, geometry, results, options):
+        start = time.time()
+        invalid = findInvalid(grids, geometry)
+        for row in numpy.nonzero(invalid)[0]:
+            results[indices[row]] = SolveResult(INVALID, message=findConflicts(grids[row].tolist()))
+        indices = [index for index, bad in zip(indices, invalid) if not bad]
+        if not indices:
+            return
+        grids = grids[~invalid].astype(numpy.uint8) # a copy, propagation fills it in
+        filled = (grids == 0).sum(axis=1)
+        dead = propagateBatch(grids, geometry)
+        filled -= (grids == 0).sum(axis=1)
+        solved = (grids != 0).all(axis=1) & ~dead
+        self.assigned += int(filled.sum())
+        share = (time.time() - start) / len(indices)
+        for row, index in enumerate(indices):
+            stats = {"assigned": int(filled[row]), "mistakes": 0, "time": share, "vectorized": True}
+            if dead[row]:
+                results[index] = SolveResult(UNSOLVABLE, stats=stats)
+            elif solved[row]:
+                results[index] = SolveResult(SOLVED, grids[row].tolist(), stats)
+            else:
+                result = self.solveScalar(grids[row].tolist(), options)
+                result.stats["propagated"] = int(filled[row])
+                results[index] = result
+
+#A (boards, cells) array of numbers, 0 for blanks, or None when some cell is not a number
+def toArray(boards):
+    try:
+        return numpy.array([[0 if number == "" else number for number in board] for board in boards],
+                           dtype=numpy.int64)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+#Marks the boards with a number out of range or used twice in a unit; findConflicts
+#then only runs on those to describe the problem
+def findInvalid(grids, geometry):
+    unitCells, cellUnits = getIndexTables(geometry)
+    outOfRange = ((grids < 0) | (grids > geometry.size)).any(axis=1)
+    numbers = numpy.where(outOfRange[:, None], 0, grids)
+    unitBits = getBitTable(geometry.size)[numbers][:, unitCells] # (boards, units, unit cells)
+    inUnit = numpy.bitwise_or.reduce(unitBits, axis=2)
+    return outOfRange | (popcount(inUnit) != (unitBits != 0).sum(axis=2)).any(axis=1)
+
+#bits[number] is the candidate bit of number, 0 for a blank
+def getBitTable(size):
+    return numpy.array([0] + [1 << number for number in range(size)], dtype=numpy.uint32)
+
+_indexTables = {}
+
+#unitCells[unit] lists the cells of a unit, cellUnits[cell] the units (row, column, box) of a cell
+def getIndexTables(geometry):
+    if geometry.boxSize not in _indexTables:
+        unitCells = numpy.array(geometry.units, dtype=numpy.intp)
+        size = geometry.size
+        cellUnits = numpy.array([(geometry.rowOf[cell], size + geometry.colOf[cell], 2 * size + geometry.boxOf[cell])
+                                 for cell in range(geometry.cells)], dtype=numpy.intp)
+        _indexTables[geometry.boxSize] = (unitCells, cellUnits)
+    return _indexTables[geometry.boxSize]
+
+def propagateBatch(grids, geometry):
+    '''
+    Apply naked and hidden singles to every board of grids (changed in
+    place) until none applies. Returns a boolean array marking the boards
+    that turned out to have no solution. Candidates are kept as bitmasks,
+    one uint32 per cell, like the masks of Solver.
+    '''
+    unitCells, cellUnits = getIndexTables(geometry)
+    size = geometry.size
+    allNumbers = numpy.uint32(geometry.allNumbers)
+    bitOf = getBitTable(size)
+    dead = numpy.zeros(len(grids), dtype=bool)
+    active = numpy.arange(len(grids)) # the boards that changed in the last round
+    while len(active):
+        batch = grids[active]
+        empty = batch == 0
+        unitBits = bitOf[batch][:, unitCells] # (boards, units, unit cells)
+        inUnit = numpy.bitwise_or.reduce(unitBits, axis=2) # (boards, units)
+        used = inUnit[:, cellUnits[:, 0]] | inUnit[:, cellUnits[:, 1]] | inUnit[:, cellUnits[:, 2]]
+        candidates = numpy.where(empty, ~used & allNumbers, 0).astype(numpy.uint32) # (boards, cells)
+        counts = popcount(candidates)
+        unitCandidates = candidates[:, unitCells] # (boards, units, unit cells)
+        once = numpy.zeros(inUnit.shape, dtype=numpy.uint32)
+        twice = numpy.zeros(inUnit.shape, dtype=numpy.uint32)
+        for position in range(size):
+            twice |= once & unitCandidates[:, :, position]
+            once |= unitCandidates[:, :, position]
+        broken = (popcount(inUnit) != (unitBits != 0).sum(axis=2)).any(axis=1) | \
+                 (empty & (counts == 0)).any(axis=1) | \
+                 ((once | inUnit) != allNumbers).any(axis=1)
+
+        #Naked singles: the only candidate of a cell
+        values = numpy.where(empty & (counts == 1), toNumber(numpy.where(counts == 1, candidates, 1)), 0)
+        #Hidden singles: the only place of a number in a unit. Two singles that
+        #collide leave a unit without a place for a number, caught next round.
+        hidden = once & ~twice & ~inUnit
+        for position in range(size):
+            hits = unitCandidates[:, :, position] & hidden
+            board, unit = numpy.nonzero(hits)
+            if len(board):
+                bits = hits[board, unit]
+                values[board, unitCells[unit, position]] = toNumber(bits & (~bits + numpy.uint32(1)))
+
+        changed = (values != 0).any(axis=1) & ~broken
+        batch = numpy.where(values != 0, values, batch).astype(grids.dtype)
+        grids[active[changed]] = batch[changed]
+        dead[active[broken]] = True
+        active = active[changed]
+    return dead
+
+def popcount(masks):
+    masks = masks - ((masks >> 1) & 0x55555555)
+    masks = (masks & 0x33333333) + ((masks >> 2) & 0x33333333)
+    masks = (masks + (masks >> 4)) & 0x0F0F0F0F
+    return ((masks * numpy.uint32(0x01010101)) & 0xFFFFFFFF) >> 24
+
+#The number of a single-bit mask
+def toNumber(bits):
+    return numpy.log2(bits).astype(numpy.int64) + 1